@@ -0,0 +1,210 @@
+"""
+Audio I/O backends for AudioHandler.
+
+A source opens input streams and a sink opens output streams:
+
+    source.open_input(rate, channels, sample_width, frames_per_buffer)
+        -> stream with read(frame_count) -> bytes (b'' once the source is exhausted),
+           stop_stream(), close()
+    sink.open_output(rate, channels, sample_width, frames_per_buffer, callback)
+        -> stream that calls callback(frame_count) -> bytes for every buffer it plays,
+           with get_output_latency() (seconds), stop_stream(), close()
+    backend.terminate()
+
+Sources also say whether they are `live`: frames from a live source are
+dropped when the consumer falls behind, others wait for it.
+
+PyAudioBackend is both a source and a sink for the sound card. FileSource and
+NullSink need no audio hardware (or PyAudio), for headless runs, benchmarks
+and load tests.
+"""
+import threading
+import time
+import wave
+
+from logger import logger
+
+
+class PyAudioBackend:
+    """Sound card input and output through PyAudio."""
+    live = True  # Capture cannot wait for a slow consumer
+
+    def __init__(self):
+        import pyaudio  # Only needed when a real audio device is used
+        self._pyaudio = pyaudio
+        self.p = pyaudio.PyAudio()
+
+    def format_for(self, sample_width):
+        return self.p.get_format_from_width(sample_width)
+
+    def open_input(self, rate, channels, sample_width, frames_per_buffer):
+        stream = self.p.open(
+            format=self.format_for(sample_width),
+            channels=channels,
+            rate=rate,
+            input=True,
+            frames_per_buffer=frames_per_buffer
+        )
+        return _PyAudioInput(stream)
+
+    def open_output(self, rate, channels, sample_width, frames_per_buffer, callback):
+        def stream_callback(in_data, frame_count, time_info, status):
+            return callback(frame_count), self._pyaudio.paContinue
+
+        return self.p.open(
+            format=self.format_for(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+            frames_per_buffer=frames_per_buffer,
+            stream_callback=stream_callback
+        )
+
+    def terminate(self):
+        self.p.terminate()
+
+
+class _PyAudioInput:
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, frame_count):
+        return self._stream.read(frame_count)
+
+    def stop_stream(self):
+        self._stream.stop_stream()
+
+    def close(self):
+        self._stream.close()
+
+
+class FileSource:
+    """
+    Plays a WAV or headerless raw PCM file as microphone input. `speed` paces
+    reads relative to real time (1.0 = real time, 4.0 = four times faster,
+    0 = as fast as the reader asks). With `loop`, the file repeats forever.
+    WAV files must match the handler's rate, channels and sample width.
+    """
+    live = False  # Capture waits for the consumer instead of dropping audio
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+    def open_input(self, rate, channels, sample_width, frames_per_buffer):
+        if self.path.endswith(".wav"):
+            with wave.open(self.path, "rb") as wav:
+                if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (rate, channels, sample_width):
+                    raise ValueError(f"{self.path} is not {rate} Hz, {channels} channel(s), {sample_width * 8}-bit PCM")
+                audio = wav.readframes(wav.getnframes())
+        else:
+            with open(self.path, "rb") as f:
+                audio = f.read()
+        return _FileInput(audio, rate, channels * sample_width, self.speed, self.loop)
+
+    def terminate(self):
+        pass
+
+
+class _FileInput:
+    def __init__(self, audio, rate, frame_bytes, speed, loop):
+        self._audio = memoryview(audio)
+        self._rate = rate
+        self._frame_bytes = frame_bytes
+        self._speed = speed
+        self._loop = loop
+        self._position = 0
+        self._started_at = time.monotonic()
+        self._frames_read = 0
+
+    def read(self, frame_count):
+        if self._position >= len(self._audio):
+            if not self._loop or not len(self._audio):
+                return b''
+            self._position = 0
+        nbytes = frame_count * self._frame_bytes
+        chunk = bytes(self._audio[self._position:self._position + nbytes])
+        self._position += len(chunk)
+        self._frames_read += len(chunk) // self._frame_bytes
+
+        if self._speed > 0:
+            # Sleep until the audio read so far is due, like a device would
+            due_at = self._started_at + self._frames_read / self._rate / self._speed
+            delay = due_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return chunk
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink:
+    """
+    Output device stand-in that pulls audio from the callback on its own thread
+    at `speed` times real time and discards it. With `speed` 0 audio is pulled
+    as fast as it is produced and idle silence is skipped. With `record_path`,
+    everything played is written there as a WAV file.
+    """
+    def __init__(self, speed=1.0, record_path=None):
+        self.speed = speed
+        self.record_path = record_path
+        self.played_bytes = 0
+
+    def open_output(self, rate, channels, sample_width, frames_per_buffer, callback):
+        return _NullOutput(self, rate, channels, sample_width, frames_per_buffer, callback)
+
+    def terminate(self):
+        pass
+
+
+class _NullOutput:
+    def __init__(self, sink, rate, channels, sample_width, frames_per_buffer, callback):
+        self._sink = sink
+        self._callback = callback
+        self._frames_per_buffer = frames_per_buffer
+        self._buffer_s = frames_per_buffer / rate
+        self._wav = None
+        if sink.record_path:
+            self._wav = wave.open(sink.record_path, "wb")
+            self._wav.setnchannels(channels)
+            self._wav.setsampwidth(sample_width)
+            self._wav.setframerate(rate)
+        self._running = True
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        next_at = time.monotonic()
+        while self._running:
+            audio = self._callback(self._frames_per_buffer)
+            if self._sink.speed <= 0 and audio.count(0) == len(audio):
+                time.sleep(0.001)  # Idle; don't spin or record endless silence
+                continue
+            self._sink.played_bytes += len(audio)
+            if self._wav is not None:
+                self._wav.writeframes(audio)
+            if self._sink.speed > 0:
+                next_at += self._buffer_s / self._sink.speed
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def get_output_latency(self):
+        return 0.0
+
+    def stop_stream(self):
+        self._running = False
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def close(self):
+        self.stop_stream()
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+            logger.info(f"🔊 Recorded output to {self._sink.record_path}")
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import deque
+
+
+def offer_latest(queue, item):
+    """Put an item on an asyncio queue, dropping the oldest item if it is full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+class RingBuffer:
+    """
+    Fixed-capacity byte ring buffer backed by a preallocated bytearray.
+    Writes never allocate; once full, the oldest bytes are overwritten.
+    """
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._write_pos = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def write(self, data):
+        """Append data, overwriting the oldest bytes when the buffer is full."""
+        n = len(data)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            # Only the most recent `capacity` bytes can be retained
+            self._view[:] = memoryview(data)[n - self.capacity:]
+            self._write_pos = 0
+            self._size = self.capacity
+            return
+
+        first = min(n, self.capacity - self._write_pos)
+        self._view[self._write_pos:self._write_pos + first] = memoryview(data)[:first]
+        if first < n:
+            self._view[:n - first] = memoryview(data)[first:]
+        self._write_pos = (self._write_pos + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def read_all(self):
+        """Return the retained bytes, oldest first."""
+        if self._size < self.capacity:
+            return bytes(self._view[self._write_pos - self._size:self._write_pos])
+        return bytes(self._view[self._write_pos:]) + bytes(self._view[:self._write_pos])
+
+    def clear(self):
+        self._write_pos = 0
+        self._size = 0
+
+
+class JitterBuffer:
+    """
+    Thread-safe playout buffer between the websocket receiver and the audio device.
+
+    Playback starts once `target_ms` of audio is buffered. The target adapts to
+    observed inter-arrival jitter (late arrivals relative to the audio duration
+    already delivered) between `min_target_ms` and `max_target_ms`. When the
+    buffer would exceed `max_buffer_ms`, the oldest audio is dropped. Underruns
+    put the buffer back into pre-buffering until the target is reached again.
+
+    Offsets returned by read() count every byte ever put into the buffer, so
+    callers can map the read position back to what they enqueued.
+
+    mark_end() queues an end-of-stream marker behind the audio already put.
+    While a marker is pending the remaining audio is drained regardless of the
+    target depth, and read() reports when the marker is reached.
+    """
+    def __init__(self, bytes_per_ms, min_target_ms=40, max_target_ms=300, max_buffer_ms=60000):
+        self.bytes_per_ms = bytes_per_ms
+        self.min_target_ms = min_target_ms
+        self.max_target_ms = max_target_ms
+        self.max_buffer_bytes = int(max_buffer_ms * bytes_per_ms)
+
+        self._chunks = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._playing = False
+        self._last_arrival = None
+        self._last_chunk_ms = 0.0
+        self.enqueued_bytes = 0
+        self._end_markers = 0
+
+        self.jitter_ms = 0.0
+        self.target_ms = min_target_ms
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def depth_ms(self):
+        return self._size / self.bytes_per_ms
+
+    def _update_jitter(self, chunk_ms):
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            gap_ms = (now - self._last_arrival) * 1000
+            late_ms = max(0.0, gap_ms - self._last_chunk_ms)
+            self.jitter_ms += (late_ms - self.jitter_ms) / 8
+            self.target_ms = min(max(self.min_target_ms + 2 * self.jitter_ms, self.min_target_ms), self.max_target_ms)
+        self._last_arrival = now
+        self._last_chunk_ms = chunk_ms
+
+    def put(self, data):
+        with self._cond:
+            self._update_jitter(len(data) / self.bytes_per_ms)
+            # Compact: drop the oldest audio to stay within the bound
+            while self._chunks and self._size + len(data) > self.max_buffer_bytes:
+                dropped = self._chunks.popleft()
+                if dropped is None:
+                    self._end_markers -= 1  # The whole stream it ended was dropped
+                    continue
+                self._size -= len(dropped)
+                self.dropped_bytes += len(dropped)
+                self.overruns += 1
+            self._chunks.append(data)
+            self._size += len(data)
+            self.enqueued_bytes += len(data)
+            self._cond.notify()
+
+    def mark_end(self):
+        """Queue an end-of-stream marker after the audio put so far."""
+        with self._cond:
+            self._chunks.append(None)
+            self._end_markers += 1
+            self._cond.notify()
+
+    def _take(self, nbytes):
+        out = bytearray()
+        while self._chunks and len(out) < nbytes and self._chunks[0] is not None:
+            chunk = self._chunks[0]
+            need = nbytes - len(out)
+            if len(chunk) <= need:
+                out += self._chunks.popleft()
+            else:
+                view = memoryview(chunk)
+                out += view[:need]
+                self._chunks[0] = view[need:]
+        self._size -= len(out)
+
+        reached_end = bool(self._chunks) and self._chunks[0] is None
+        if reached_end:
+            self._chunks.popleft()
+            self._end_markers -= 1
+            self._playing = False  # The next stream pre-buffers again
+        return bytes(out), reached_end
+
+    def read(self, nbytes, timeout=None):
+        """
+        Return (audio, end_offset, reached_end): up to `nbytes` of audio once
+        playback may proceed (b'' on timeout), the stream offset just past it,
+        and whether an end-of-stream marker directly followed that audio.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._chunks and (self._playing or self._end_markers):
+                    break
+                if not self._playing and self._size >= self.target_ms * self.bytes_per_ms:
+                    self._playing = True
+                    break
+                if self._playing and self._size == 0:
+                    self.underruns += 1
+                    self._playing = False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return b'', self.enqueued_bytes - self._size, False
+                self._cond.wait(remaining)
+            audio, reached_end = self._take(nbytes)
+            return audio, self.enqueued_bytes - self._size, reached_end
+
+    def reset_arrivals(self):
+        """Forget inter-arrival history, e.g. at the start of a new response."""
+        with self._cond:
+            self._last_arrival = None
+
+    def clear(self):
+        """Drop all buffered audio and wake any waiting reader."""
+        with self._cond:
+            self._chunks.clear()
+            self._size = 0
+            self._end_markers = 0
+            self._playing = False
+            self._last_arrival = None
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "depth_ms": round(self.depth_ms),
+            "target_ms": round(self.target_ms),
+            "jitter_ms": round(self.jitter_ms, 1),
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+            "dropped_ms": round(self.dropped_bytes / self.bytes_per_ms),
+        }
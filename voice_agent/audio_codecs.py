@@ -0,0 +1,174 @@
+"""
+Audio formats for call legs, and numpy-vectorized conversion between them.
+
+The realtime API takes pcm16 (24 kHz), g711_ulaw and g711_alaw (8 kHz)
+natively, so callers in those formats are passed through untouched. Other
+formats are converted to and from 24 kHz pcm16.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+
+class AudioFormat(NamedTuple):
+    name: str
+    sample_rate: int
+    sample_width: int  # Bytes per sample
+    encoding: str  # "pcm16", "g711_ulaw" or "g711_alaw"
+
+    @property
+    def bytes_per_ms(self):
+        return self.sample_rate * self.sample_width / 1000
+
+
+AUDIO_FORMATS = {
+    "pcm16": AudioFormat("pcm16", 24000, 2, "pcm16"),
+    "g711_ulaw": AudioFormat("g711_ulaw", 8000, 1, "g711_ulaw"),
+    "g711_alaw": AudioFormat("g711_alaw", 8000, 1, "g711_alaw"),
+    "pcm16_8k": AudioFormat("pcm16_8k", 8000, 2, "pcm16"),
+    "pcm16_16k": AudioFormat("pcm16_16k", 16000, 2, "pcm16"),
+}
+
+# Formats the realtime API accepts for input_audio_format / output_audio_format
+REALTIME_FORMATS = {"pcm16", "g711_ulaw", "g711_alaw"}
+
+
+def negotiate_format(name):
+    """
+    Return (caller_format, upstream_format) for a caller asking for format `name`.
+    Raises ValueError for unknown formats.
+    """
+    if name not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format: {name}")
+    caller = AUDIO_FORMATS[name]
+    upstream = caller if caller.name in REALTIME_FORMATS else AUDIO_FORMATS["pcm16"]
+    return caller, upstream
+
+
+# ── G.711 ──────────────────────────────────────
+# Encoding uses a lookup table over all 65536 PCM16 values and decoding one
+# over all 256 code words, both built once with the ITU-T G.711 segment rules,
+# so converting a chunk is a single numpy gather.
+
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _build_ulaw_encode_table():
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), 8159) + 0x21
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+    code = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code) ^ mask
+    return _by_uint16(code.astype(np.uint8))
+
+
+def _build_ulaw_decode_table():
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    magnitude = (((code & 0x0F) << 3) + 0x84) << ((code & 0x70) >> 4)
+    return np.where(code & 0x80, 0x84 - magnitude, magnitude - 0x84).astype(np.int16)
+
+
+def _build_alaw_encode_table():
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    magnitude = np.where(pcm >= 0, pcm, -pcm - 1)
+    segment = np.searchsorted(_ALAW_SEGMENT_ENDS, magnitude)
+    shift = np.where(segment < 2, 1, segment)
+    code = (segment << 4) | ((magnitude >> shift) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code) ^ mask
+    return _by_uint16(code.astype(np.uint8))
+
+
+def _build_alaw_decode_table():
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    segment = (code & 0x70) >> 4
+    magnitude = ((code & 0x0F) << 4) + np.where(segment == 0, 8, 0x108)
+    magnitude = np.where(segment > 1, magnitude << np.maximum(segment - 1, 0), magnitude)
+    return np.where(code & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+def _by_uint16(table):
+    """Reorder a table built for int16 values -32768..32767 so it is indexed by their uint16 bit pattern."""
+    return np.roll(table, -32768)
+
+
+_ENCODE_TABLES = {"g711_ulaw": _build_ulaw_encode_table(), "g711_alaw": _build_alaw_encode_table()}
+_DECODE_TABLES = {"g711_ulaw": _build_ulaw_decode_table(), "g711_alaw": _build_alaw_decode_table()}
+
+
+def encode_pcm16(samples, encoding):
+    """Encode int16 samples as `encoding` bytes."""
+    if encoding == "pcm16":
+        return samples.astype(np.int16).tobytes()
+    return _ENCODE_TABLES[encoding][samples.astype(np.int16).view(np.uint16)].tobytes()
+
+
+def decode_to_pcm16(data, encoding):
+    """Decode `encoding` bytes to int16 samples."""
+    if encoding == "pcm16":
+        return np.frombuffer(data, dtype=np.int16)
+    return _DECODE_TABLES[encoding][np.frombuffer(data, dtype=np.uint8)]
+
+
+# ── Resampling ─────────────────────────────────
+
+class Resampler:
+    """
+    Streaming mono resampler: linear interpolation, preceded by a windowed-sinc
+    low-pass when downsampling. Filter history and the fractional read position
+    carry over between chunks, so chunk boundaries are seamless.
+    """
+    def __init__(self, src_rate, dst_rate, taps=31):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self._filter = None
+        if dst_rate < src_rate:
+            cutoff = 0.45 * dst_rate / src_rate  # Just below the new Nyquist, in cycles per input sample
+            n = np.arange(taps) - (taps - 1) / 2
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+            self._filter = (kernel / kernel.sum()).astype(np.float32)
+            self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._previous = np.zeros(1, dtype=np.float32)  # Last input sample of the previous chunk
+        # Next output position in units of 1/dst_rate input sample (exact integer steps of src_rate),
+        # indexing [previous, *chunk]. Starting one step past `previous` makes every chunk of n
+        # samples yield n * dst_rate / src_rate samples when that is whole (8000 -> 24000).
+        self._position = src_rate
+
+    def process(self, samples):
+        """Resample a chunk of int16 samples; returns int16 samples."""
+        x = samples.astype(np.float32)
+        if not len(x):
+            return np.zeros(0, dtype=np.int16)
+        if self._filter is not None:
+            padded = np.concatenate((self._history, x))
+            self._history = padded[len(padded) - len(self._history):]
+            x = np.convolve(padded, self._filter, mode="valid")
+
+        y = np.concatenate((self._previous, x))
+        end = (len(y) - 1) * self.dst_rate
+        count = (end - self._position) // self.src_rate + 1 if self._position <= end else 0
+        positions = (self._position + self.src_rate * np.arange(count)) / self.dst_rate
+        out = np.interp(positions, np.arange(len(y)), y)
+
+        self._position += self.src_rate * count - end
+        self._previous = y[-1:]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+class Transcoder:
+    """One direction of a call leg: decode `src`, resample, encode as `dst`."""
+    def __init__(self, src, dst):
+        self.src = src
+        self.dst = dst
+        self.passthrough = src == dst
+        self._resampler = Resampler(src.sample_rate, dst.sample_rate) if src.sample_rate != dst.sample_rate else None
+
+    def convert(self, data):
+        if self.passthrough:
+            return data
+        samples = decode_to_pcm16(data, self.src.encoding)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        return encode_pcm16(samples, self.dst.encoding)
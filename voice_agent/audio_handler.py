@@ -1,44 +1,90 @@
-import pyaudio
+import asyncio
 import threading
 import logging
-from threading import Event
-from queue import Queue
+import time
+from collections import deque
 from logger import logger
+from audio_buffers import RingBuffer, JitterBuffer, offer_latest
+from audio_backends import PyAudioBackend
+from metrics import LatencyStats
+from config import (
+    CAPTURE_RETENTION_SECONDS,
+    PLAYOUT_MIN_TARGET_MS,
+    PLAYOUT_MAX_TARGET_MS,
+    PLAYOUT_MAX_BUFFER_MS,
+)
+
 
 class AudioHandler:
     """
-    Handles audio input and output using PyAudio.
+    Handles audio input and output through pluggable backends (see audio_backends):
+    `source` for capture and `sink` for playback, the sound card via PyAudio by default.
+    Output goes through one persistent callback-mode stream fed by a jitter buffer.
     """
-    def __init__(self):
-        self.p = pyaudio.PyAudio()
+    def __init__(self, retention_seconds=None, source=None, sink=None):
+        if source is None or sink is None:
+            device = PyAudioBackend()
+            source = source or device
+            sink = sink or device
+        self.source = source
+        self.sink = sink
         self.stream = None
-        self.audio_buffer = b''
         self.chunk_size = 1024  # Number of audio frames per buffer
-        self.format = pyaudio.paInt16  # Audio format (16-bit PCM)
+        self.sample_width = 2  # Bytes per sample (16-bit PCM)
         self.channels = 1  # Mono audio
         self.rate = 24000  # Sampling rate in Hz
+        self.bytes_per_ms = self.rate * self.channels * self.sample_width / 1000
         self.is_recording = False
-        self.playback_thread = None
-        self.stop_playback_event = Event()
-        
+        self.capture_thread = None
+
+        # Bounded "last N seconds" capture retention, preallocated once
+        if retention_seconds is None:
+            retention_seconds = CAPTURE_RETENTION_SECONDS
+        retention_bytes = int(retention_seconds * self.rate) * self.channels * self.sample_width
+        self.audio_buffer = RingBuffer(retention_bytes) if retention_bytes > 0 else None
+
         # Streaming audio playback attributes
-        self.streaming_queue = Queue()
-        self.streaming_thread = None
-        self.is_streaming = False
-        self.streaming_output_stream = None
-        self.audio_response_complete = False
+        self.jitter_buffer = JitterBuffer(
+            bytes_per_ms=self.bytes_per_ms,
+            min_target_ms=PLAYOUT_MIN_TARGET_MS,
+            max_target_ms=PLAYOUT_MAX_TARGET_MS,
+            max_buffer_ms=PLAYOUT_MAX_BUFFER_MS,
+        )
+        self.is_streaming = False  # A response is currently being played
+        self.output_stream = None  # Long-lived callback-mode output stream
+        self.playback_idle = threading.Event()  # Set whenever nothing is left to play
+        self.playback_idle.set()
+        self._silence = bytes(self.chunk_size * self.channels * self.sample_width)
+
+        # Bumping the generation invalidates the response being played. Callbacks
+        # registered by interrupt_playback fire once the output callback goes silent.
+        self._playback_lock = threading.Lock()
+        self._playback_generation = 0
+        self._silenced_callbacks = []
+
+        # Played-audio accounting: (stream offset, item_id, content_index) where each
+        # response item's audio starts, and the stream offset written to the device.
+        self._item_marks = deque()
+        self._played_offset = 0
+        self._output_latency_ms = 0.0
+
+        # Latency accounting for the persistent output stream
+        self.device_open_ms = None
+        self.first_sample_latency = LatencyStats()
+        self._response_started_at = None
+        # Called as on_playback(event, timestamp) from the audio thread when a response's
+        # first sample is handed to the device ("first_sample") and when it has played out
+        # ("finished"); timestamps are time.monotonic() values. Only audio tagged with an
+        # item id counts as a response, so filler clips raise no events.
+        self.on_playback = None
+        self._item_start_offset = None  # Stream offset of a tagged item not yet handed to the device
+        self._tagged_queued = False  # Tagged audio queued since playback last finished
 
     def start_audio_stream(self):
         """
         Start the audio input stream.
         """
-        self.stream = self.p.open(
-            format=self.format,
-            channels=self.channels,
-            rate=self.rate,
-            input=True,
-            frames_per_buffer=self.chunk_size
-        )
+        self.stream = self.source.open_input(self.rate, self.channels, self.sample_width, self.chunk_size)
 
     def stop_audio_stream(self):
         """
@@ -47,168 +93,269 @@ class AudioHandler:
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
+            self.stream = None
 
     def start_recording(self):
         """Start continuous recording"""
         self.is_recording = True
-        self.audio_buffer = b''
+        if self.audio_buffer is not None:
+            self.audio_buffer.clear()
         self.start_audio_stream()
 
     def stop_recording(self):
-        """Stop recording and return the recorded audio"""
+        """Stop recording and return the retained audio (empty if retention is disabled)"""
         self.is_recording = False
         self.stop_audio_stream()
-        return self.audio_buffer
+        return self.audio_buffer.read_all() if self.audio_buffer is not None else b''
 
     def record_chunk(self):
         """Record a single chunk of audio"""
         if self.stream and self.is_recording:
             data = self.stream.read(self.chunk_size)
-            self.audio_buffer += data
+            if not data:
+                return None  # Source exhausted
+            if self.audio_buffer is not None:
+                self.audio_buffer.write(data)
             return data
         return None
-    
-    def start_streaming_playback(self):
+
+    def start_capture(self, loop, frame_queue):
         """
-        Start streaming audio playback mode.
-        Audio chunks will be played as they arrive.
+        Start recording on a dedicated thread that pushes each chunk into an
+        asyncio queue owned by `loop`. A None sentinel is queued when capture ends.
+        Chunks from a live source replace the oldest queued chunk when the queue
+        is full; a non-live source (a file) waits for room instead.
         """
-        if self.is_streaming:
-            return  # Already streaming
-            
-        self.is_streaming = True
-        self.audio_response_complete = False
-        self.stop_playback_event.clear()
-        
-        # Clear any remaining items in queue
-        while not self.streaming_queue.empty():
-            try:
-                self.streaming_queue.get_nowait()
-            except:
-                break
-        
-        def streaming_playback():
+        self.start_recording()
+        live = getattr(self.source, "live", True)
+
+        def capture():
             try:
-                # Create output stream for streaming
-                self.streaming_output_stream = self.p.open(
-                    format=self.format,
-                    channels=self.channels,
-                    rate=self.rate,
-                    output=True,
-                    frames_per_buffer=self.chunk_size
-                )
-                
-                logger.info("🔊 Started streaming audio playback")
-                
-                while self.is_streaming and not self.stop_playback_event.is_set():
-                    try:
-                        # Get audio chunk from queue (with timeout)
-                        audio_chunk = self.streaming_queue.get(timeout=0.5)
-                        
-                        if audio_chunk is None:  # Sentinel to stop
-                            break
-                            
-                        # Play the chunk immediately
-                        self.streaming_output_stream.write(audio_chunk)
-                        self.streaming_queue.task_done()
-                        
-                    except:
-                        # Timeout - check if audio response is complete and queue is empty
-                        if self.audio_response_complete and self.streaming_queue.empty():
-                            logger.info("🔊 All audio chunks played, ending stream")
-                            break
-                        # Otherwise continue waiting for more chunks
-                        continue
-                            
+                while self.is_recording:
+                    data = self.record_chunk()
+                    if data is None:
+                        break
+                    if live:
+                        loop.call_soon_threadsafe(offer_latest, frame_queue, data)
+                    else:
+                        asyncio.run_coroutine_threadsafe(frame_queue.put(data), loop).result()
             except Exception as e:
-                logger.error(f"Error in streaming playback: {e}")
+                logger.error(f"Error in audio capture thread: {e}")
             finally:
-                if self.streaming_output_stream:
-                    self.streaming_output_stream.stop_stream()
-                    self.streaming_output_stream.close()
-                    self.streaming_output_stream = None
-                self.is_streaming = False
-                logger.info("🔊 Stopped streaming audio playback")
-        
-        self.streaming_thread = threading.Thread(target=streaming_playback, daemon=True)
-        self.streaming_thread.start()
+                # The capture thread owns the input stream, so close it here
+                self.stop_recording()
+                try:
+                    loop.call_soon_threadsafe(offer_latest, frame_queue, None)
+                except RuntimeError:
+                    pass  # Event loop already closed
+
+        self.capture_thread = threading.Thread(target=capture, daemon=True)
+        self.capture_thread.start()
+
+    def stop_capture(self):
+        """
+        Stop the capture thread. Blocks for at most one chunk read, so call it
+        off the event loop.
+        """
+        self.is_recording = False
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=1.0)
+        self.capture_thread = None
+
+    def start_output_stream(self):
+        """
+        Open the persistent output stream if it is not open yet. The stream runs
+        in callback mode for the lifetime of the handler, pulling audio from the
+        jitter buffer and emitting silence when there is nothing to play.
+        """
+        if self.output_stream is not None:
+            return
+        opened_at = time.monotonic()
+        self.output_stream = self.sink.open_output(
+            self.rate, self.channels, self.sample_width, self.chunk_size, self._output_callback
+        )
+        self.device_open_ms = (time.monotonic() - opened_at) * 1000
+        self._output_latency_ms = self.output_stream.get_output_latency() * 1000
+        logger.info(f"🔊 Opened persistent output stream in {self.device_open_ms:.1f} ms "
+                    f"(output latency {self._output_latency_ms:.1f} ms)")
+
+    def _output_callback(self, frame_count):
+        """
+        Output stream callback: fill one device buffer from the jitter buffer.
+        Runs on the audio thread, so it never blocks.
+        """
+        nbytes = frame_count * self.channels * self.sample_width
+        audio_chunk = b''
+        playback_events = []
+        if self.is_streaming:
+            generation = self._playback_generation
+            audio_chunk, end_offset, reached_end = self.jitter_buffer.read(nbytes, timeout=0)
+            with self._playback_lock:
+                if generation == self._playback_generation:
+                    if audio_chunk:
+                        self._played_offset = end_offset
+                        if self._response_started_at is not None:
+                            self.first_sample_latency.record((time.monotonic() - self._response_started_at) * 1000)
+                            self._response_started_at = None
+                        if self._item_start_offset is not None and end_offset > self._item_start_offset:
+                            self._item_start_offset = None
+                            playback_events.append(("first_sample", time.monotonic()))
+                    if reached_end and not len(self.jitter_buffer):
+                        # End-of-response marker reached and nothing queued behind it
+                        self.is_streaming = False
+                        self._item_marks.clear()  # Everything tagged has been played out
+                        self.playback_idle.set()
+                        if self._tagged_queued:
+                            self._tagged_queued = False
+                            # Audible until the device has played this buffer too
+                            playback_events.append(("finished", time.monotonic() + self._output_latency_ms / 1000))
+                        logger.info(f"🔊 All audio chunks played - playout stats: {self.jitter_buffer.stats()}")
+                else:
+                    audio_chunk = b''  # Interrupted while reading
+            if self.on_playback:
+                for event, at in playback_events:
+                    self.on_playback(event, at)
+
+        if self._silenced_callbacks and not audio_chunk:
+            # Audio queued in earlier device buffers is audible for one more output latency
+            silenced_at = time.monotonic() + self._output_latency_ms / 1000
+            with self._playback_lock:
+                callbacks, self._silenced_callbacks = self._silenced_callbacks, []
+            for on_silenced in callbacks:
+                on_silenced(silenced_at)
+
+        if not audio_chunk and nbytes == len(self._silence):
+            return self._silence
+        if len(audio_chunk) < nbytes:
+            audio_chunk += bytes(nbytes - len(audio_chunk))  # Pad a short read with silence
+        return audio_chunk
+
+    def start_streaming_playback(self):
+        """
+        Start playing a new response through the persistent output stream.
+        Audio chunks will be played as they arrive.
+        """
+        self.start_output_stream()
+        with self._playback_lock:
+            if self.is_streaming:
+                return  # Already streaming
+            self.playback_idle.clear()
+            self._response_started_at = time.monotonic()
+            self.jitter_buffer.reset_arrivals()
+            self.is_streaming = True
 
     def mark_audio_response_complete(self):
         """
-        Mark that no more audio chunks will arrive for this response.
+        Mark that no more audio chunks will arrive for this response by queueing
+        an end-of-stream marker; the output callback drains what is buffered
+        and goes idle as soon as it reaches the marker.
         """
-        self.audio_response_complete = True
+        with self._playback_lock:
+            if not self.is_streaming:
+                return  # Interrupted or never started; nothing to end
+            self.jitter_buffer.mark_end()
         logger.debug("🔊 Audio response marked as complete")
 
-    def add_streaming_audio(self, audio_data):
+    def add_streaming_audio(self, audio_data, item_id=None, content_index=0):
         """
-        Add audio data to the streaming queue for immediate playback.
+        Add audio data to the jitter buffer for streaming playback.
+        `item_id` identifies the conversation item the audio belongs to, so the
+        played position within that item can be reported on interruption.
         """
         if not self.is_streaming:
             self.start_streaming_playback()
-            
-        self.streaming_queue.put(audio_data)
+
+        with self._playback_lock:
+            # Untagged audio (a filler clip) gets a None mark so it is not counted into the item before it
+            last_item_id = self._item_marks[-1][1] if self._item_marks else None
+            if item_id != last_item_id:
+                self._prune_item_marks()
+                self._item_marks.append((self.jitter_buffer.enqueued_bytes, item_id, content_index))
+                if item_id is not None:
+                    # A new item may queue behind a filler clip; its first sample is where it starts
+                    self._item_start_offset = self.jitter_buffer.enqueued_bytes
+            if item_id is not None:
+                self._tagged_queued = True
+
+        self.jitter_buffer.put(audio_data)
+
+    def _prune_item_marks(self):
+        """Forget items that finished playing before the current one started."""
+        while len(self._item_marks) > 1 and self._item_marks[1][0] <= self._played_offset:
+            self._item_marks.popleft()
+
+    def _playback_position(self):
+        """
+        Return (item_id, content_index, audio_end_ms) for the audio heard so far,
+        or None if no tagged item has started playing. Caller holds _playback_lock.
+        """
+        self._prune_item_marks()
+        if not self._item_marks or self._item_marks[0][0] > self._played_offset:
+            return None
+
+        start, item_id, content_index = self._item_marks[0]
+        if item_id is None:
+            return None
+        # Audio still inside the device buffer has been written but not heard yet
+        played_ms = (self._played_offset - start) / self.bytes_per_ms - self._output_latency_ms
+        return item_id, content_index, max(0, int(played_ms))
+
+    def interrupt_playback(self, on_silenced=None):
+        """
+        Cancel streaming playback without blocking the caller (barge-in).
+        Buffered audio is dropped and the output callback switches to silence
+        on its next buffer. `on_silenced(timestamp)` is called from the audio
+        thread with the time the output becomes silent.
+
+        Returns (item_id, content_index, audio_end_ms) for the item that was cut
+        off, None if nothing tagged was playing, or False if playback was idle.
+        """
+        with self._playback_lock:
+            if not self.is_streaming:
+                return False
+            if on_silenced:
+                self._silenced_callbacks.append(on_silenced)
+            self._playback_generation += 1
+            self.is_streaming = False
+            position = self._playback_position()
+            self._item_marks.clear()
+            self._response_started_at = None
+            self._item_start_offset = None
+            self._tagged_queued = False
+
+        logger.info("🔊 Interrupting streaming audio playback...")
+        # Drop buffered audio; the next output callback plays silence
+        self.jitter_buffer.clear()
+        self.playback_idle.set()
+        return position
 
     def stop_streaming_playback(self):
         """
         Stop streaming audio playback immediately.
         """
-        if not self.is_streaming:
-            return
-            
-        logger.info("🔊 Force stopping streaming audio playback...")
-        self.is_streaming = False
-        self.audio_response_complete = True
-        self.stop_playback_event.set()
-        
-        # Add sentinel to wake up the streaming thread
-        try:
-            self.streaming_queue.put_nowait(None)
-        except:
-            pass  # Queue might be full, that's ok
-        
-        # Wait for streaming thread to finish
-        if self.streaming_thread and self.streaming_thread.is_alive():
-            self.streaming_thread.join(timeout=1.0)
+        self.interrupt_playback()
 
     def play_audio(self, audio_data):
         """
-        Play audio data, stopping any previous playback in progress.
-        This is the original buffered playback method.
+        Play a complete audio clip, stopping any previous playback in progress.
         """
-        # Stop any streaming playback first
-        self.stop_streaming_playback()
-        
-        def play():
-            stream = self.p.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                output=True
-            )
-            chunk_size = 1024
-            for i in range(0, len(audio_data), chunk_size):
-                if self.stop_playback_event.is_set():
-                    break  # Stop playback if new input starts
-                stream.write(audio_data[i:i+chunk_size])
-            stream.stop_stream()
-            stream.close()
-
-        # If already playing, stop it
-        if self.playback_thread and self.playback_thread.is_alive():
-            self.stop_playback_event.set()         # Signal the thread to stop
-            self.playback_thread.join()            # Wait for it to finish
-
-        self.stop_playback_event.clear()           # Clear stop flag
-        self.playback_thread = threading.Thread(target=play)
-        self.playback_thread.start()
+        self.interrupt_playback()
+        self.add_streaming_audio(audio_data)
+        self.mark_audio_response_complete()
 
     def cleanup(self):
         """
-        Clean up resources by stopping the stream and terminating PyAudio.
+        Clean up resources by stopping the streams and terminating the backends.
         """
         self.stop_streaming_playback()
+        self.stop_capture()
         if self.stream:
             self.stop_audio_stream()
-        self.p.terminate()
+        if self.output_stream:
+            self.output_stream.stop_stream()
+            self.output_stream.close()
+            self.output_stream = None
+        self.source.terminate()
+        if self.sink is not self.source:
+            self.sink.terminate()
 
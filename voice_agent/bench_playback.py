@@ -0,0 +1,67 @@
+"""
+Playback start-up benchmark.
+
+Compares the cost of opening a fresh PyAudio output stream per response (the
+previous behaviour) with the start latency of the persistent callback-mode
+stream used by AudioHandler, measured from the first add_streaming_audio()
+call to the first audio buffer handed to the device.
+
+Usage: python bench_playback.py [--runs 20]
+"""
+import argparse
+import time
+
+from audio_handler import AudioHandler
+from metrics import LatencyStats
+
+
+def bench_device_open(handler, runs):
+    """Open a blocking output stream and write its first buffer, `runs` times."""
+    stats = LatencyStats()
+    first_buffer = bytes(handler.chunk_size * handler.channels * handler.sample_width)
+    device = handler.sink  # PyAudioBackend
+    for _ in range(runs):
+        started_at = time.monotonic()
+        stream = device.p.open(
+            format=device.format_for(handler.sample_width),
+            channels=handler.channels,
+            rate=handler.rate,
+            output=True,
+            frames_per_buffer=handler.chunk_size
+        )
+        stream.write(first_buffer)
+        stats.record((time.monotonic() - started_at) * 1000)
+        stream.stop_stream()
+        stream.close()
+    return stats
+
+
+def bench_callback_start(handler, runs):
+    """Play a short silent clip `runs` times through the persistent stream."""
+    handler.start_output_stream()
+    clip = bytes(int(200 * handler.bytes_per_ms) // 2 * 2)  # 200 ms of digital silence
+    for _ in range(runs):
+        handler.add_streaming_audio(clip)
+        handler.mark_audio_response_complete()
+        handler.playback_idle.wait()
+    return handler.first_sample_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    handler = AudioHandler()
+    try:
+        open_stats = bench_device_open(handler, args.runs)
+        callback_stats = bench_callback_start(handler, args.runs)
+        print(f"Per-response stream open + first write: {open_stats.summary()}")
+        print(f"Persistent stream open (one-off):       {handler.device_open_ms:.1f} ms")
+        print(f"Persistent stream first-sample latency: {callback_stats.summary()}")
+    finally:
+        handler.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,25 @@
 # chat_wrapper.py
 
 import uuid
+import json
+import random
+import asyncio
+import importlib.util
 import httpx
 
+from config import (
+    BACKEND_HTTP2,
+    BACKEND_MAX_CONNECTIONS,
+    BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+    BACKEND_KEEPALIVE_EXPIRY_S,
+    BACKEND_CONNECT_TIMEOUT_S,
+    BACKEND_READ_TIMEOUT_S,
+    BACKEND_RETRIES,
+    BACKEND_RETRY_BACKOFF_S,
+    BACKEND_STREAMING,
+)
+from logger import logger
+
 BASE_URL = "http://localhost:8000"  # Update if running elsewhere
 
 # Generate session info once per voice agent instance
@@ -24,7 +41,75 @@ def get_current_session_id():
     """Get the current session ID"""
     return SESSION_ID
 
-async def run_chat(user_message: str) -> str:
+# ── Pooled backend client ─────────────────────
+# One keep-alive client per process, so backend calls reuse warm connections
+_client = None
+
+# Failures where the request cannot have reached the backend, so sending it again is safe.
+# The POST is not idempotent: a dropped connection or a 504 may come after the backend has
+# taken the question, and asking again would repeat it in the conversation.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+RETRYABLE_STATUS = {502, 503}
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared backend client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = BACKEND_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("BACKEND_HTTP2 is set but the 'h2' package is not installed - using HTTP/1.1")
+            http2 = False
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=BACKEND_MAX_CONNECTIONS,
+                max_keepalive_connections=BACKEND_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=BACKEND_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=httpx.Timeout(
+                connect=BACKEND_CONNECT_TIMEOUT_S,
+                read=BACKEND_READ_TIMEOUT_S,
+                write=BACKEND_CONNECT_TIMEOUT_S,
+                pool=BACKEND_CONNECT_TIMEOUT_S,
+            ),
+        )
+    return _client
+
+async def close_client():
+    """Close the shared backend client; call on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def post_with_retry(path: str, payload: dict, headers: dict) -> httpx.Response:
+    """
+    POST through the pooled client. Failures to connect and 502/503 responses are
+    retried up to BACKEND_RETRIES times with full-jitter exponential backoff;
+    the payload keeps its request_id so the backend sees one logical request.
+    """
+    client = get_client()
+    for attempt in range(BACKEND_RETRIES + 1):
+        try:
+            response = await client.post(path, json=payload, headers=headers)
+            if response.status_code not in RETRYABLE_STATUS or attempt == BACKEND_RETRIES:
+                return response
+            reason = f"HTTP {response.status_code}"
+        except RETRYABLE_ERRORS as e:
+            if attempt == BACKEND_RETRIES:
+                raise
+            reason = f"{type(e).__name__}: {e}"
+        delay = random.uniform(0, BACKEND_RETRY_BACKOFF_S * 2 ** attempt)
+        logger.warning(f"Backend request failed ({reason}); retry {attempt + 1}/{BACKEND_RETRIES} in {delay:.2f} s")
+        await asyncio.sleep(delay)
+
+async def run_chat(user_message: str, session_id: str = None) -> str:
+    """
+    Send one question to the chatbot backend. `session_id` overrides the
+    process-wide SESSION_ID, so each gateway call keeps its own conversation.
+    """
+    headers = HEADERS if session_id is None else {**HEADERS, "session-id": session_id}
     payload = {
         "input": {"text": user_message},
         "request_id": generate_request_id(),
@@ -32,19 +117,14 @@ async def run_chat(user_message: str) -> str:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{BASE_URL}/api/v1/chatbot/respond",
-                json=payload,
-                headers=HEADERS
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("success") and data["data"].get("message"):
-                return data["data"]["message"]
-            else:
-                return "Sorry, I couldn't process that right now."
+        response = await post_with_retry("/api/v1/chatbot/respond", payload, headers)
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("success") and data["data"].get("message"):
+            return data["data"]["message"]
+        else:
+            return "Sorry, I couldn't process that right now."
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 422:
             # Log the actual error details for debugging
@@ -54,3 +134,69 @@ async def run_chat(user_message: str) -> str:
         return f"HTTP error {e.response.status_code}: {e.response.text}"
     except Exception as e:
         return f"Error reaching LangGraph backend: {e}"
+
+async def _sse_events(response):
+    """Yield the JSON payload of each Server-Sent Event in a streaming response."""
+    data_lines = []
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+        elif not line and data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+
+async def run_chat_stream(user_message: str, session_id: str = None, on_progress=None) -> str:
+    """
+    Like run_chat, but over the backend's streaming endpoint. `on_progress` is
+    called with each agent stage while the backend works, and the answer is
+    returned as soon as the backend's final-response checks have passed it,
+    without waiting for the graph run and the response envelope to finish.
+    Falls back to run_chat when streaming is disabled, the backend has no
+    streaming endpoint, or the stream cannot be opened.
+    """
+    if not BACKEND_STREAMING:
+        return await run_chat(user_message, session_id=session_id)
+
+    headers = HEADERS if session_id is None else {**HEADERS, "session-id": session_id}
+    payload = {
+        "input": {"text": user_message},
+        "request_id": generate_request_id(),
+        "type": "AGENTIC_FLOW"
+    }
+
+    received_any = False
+    try:
+        async with get_client().stream(
+            "POST", "/api/v1/chatbot/respond/stream", json=payload, headers=headers
+        ) as response:
+            if response.status_code != 404:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                async for event in _sse_events(response):
+                    received_any = True
+                    kind = event.get("type")
+                    if kind == "progress" and on_progress:
+                        on_progress(event["stage"])
+                    elif kind == "answer":
+                        return event["message"]
+                    elif kind == "done":
+                        data = event.get("data") or {}
+                        if event.get("success") and data.get("message"):
+                            return data["message"]
+                        return "Sorry, I couldn't process that right now."
+                    elif kind == "error":
+                        return f"Error reaching LangGraph backend: {event.get('detail')}"
+                return "Sorry, I couldn't process that right now."
+    except RETRYABLE_ERRORS as e:
+        if received_any:
+            # The backend already has this question; asking again would repeat it in the conversation
+            return f"Error reaching LangGraph backend: {e}"
+        logger.warning(f"Backend stream unavailable ({type(e).__name__}) - falling back to a plain request")
+    except httpx.HTTPStatusError as e:
+        return f"HTTP error {e.response.status_code}: {e.response.text}"
+    except Exception as e:
+        return f"Error reaching LangGraph backend: {e}"
+
+    # No streaming endpoint on this backend (404) or the stream could not be opened
+    return await run_chat(user_message, session_id=session_id)
@@ -15,7 +15,57 @@ from agentic_flow.utility.state_utils import generate_remove_messages
 log = Logger()
 
 
-def communicate(payload, graph):
+def _run_graph(graph, graph_input, config, on_progress=None):
+    """
+    Runs the graph to completion and returns its final state values.
+
+    Without `on_progress` this is a plain `graph.invoke`. With it, node updates
+    are streamed and every finished node is reported as a progress event. The
+    final-response nodes write the customer-facing message to the custom stream
+    once it has passed their checks (messages set by earlier nodes, such as the
+    supervisor's routing turn or an agent's draft, have not), and it is reported
+    as soon as it arrives. An ask-back interrupt is reported once the run pauses.
+
+    Args:
+        graph: Compiled graph to run.
+        graph_input: Input state or resume `Command`.
+        config (dict): Graph configuration (thread id, callbacks).
+        on_progress (callable, optional): Called with event dicts:
+            {"type": "progress", "stage": <node name>} and {"type": "answer", "message": <text>}.
+
+    Returns:
+        dict: Final graph state values.
+    """
+    if on_progress is None:
+        return graph.invoke(graph_input, config, stream_mode="values")
+
+    answered = False
+    for mode, chunk in graph.stream(graph_input, config, stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            if isinstance(chunk, dict) and chunk.get("type") == "answer" and not answered:
+                answered = True
+                on_progress(chunk)
+            continue
+        for node in chunk:
+            if node != "__interrupt__":
+                on_progress({"type": "progress", "stage": node})
+
+    state = graph.get_state(config)
+    if not answered:
+        if len(state.tasks) > 0 and len(state.tasks[0].interrupts) > 0:
+            # The graph paused to ask the user something; that question is the answer
+            message = state.tasks[0].interrupts[0].value
+        else:
+            response = state.values.get("response")
+            if hasattr(response, "dict"):
+                response = response.dict()
+            message = response.get("message") if isinstance(response, dict) else None
+        if isinstance(message, str) and message:
+            on_progress({"type": "answer", "message": message})
+    return state.values
+
+
+def communicate(payload, graph, on_progress=None):
     """
     Processes user input through the provided graph object (e.g., SupervisorAgent)
     and returns a structured response.
@@ -23,6 +73,7 @@ def communicate(payload, graph):
     Args:
         payload (dict): Dictionary containing interaction metadata including user input.
         graph: Graph interface instance with `.stream()` and `.get_state()` methods.
+        on_progress (callable, optional): Receives progress events while the graph runs (see `_run_graph`).
 
     Returns:
         str: A JSON-formatted string with the result from the SupervisorAgent graph.
@@ -82,7 +133,7 @@ def communicate(payload, graph):
                 )
             
                 log.info(f"Invoking graph with interrupt resume command")
-                result = graph.invoke(command, config, stream_mode="values")
+                result = _run_graph(graph, command, config, on_progress)
                 log.info(f"Interrupt resume completed successfully")
             
                 span.update_trace(output={"response": result})
@@ -117,7 +168,7 @@ def communicate(payload, graph):
                 )
                 
                 log.info(f"Invoking graph with user query: '{query}'")
-                result = graph.invoke({"messages": ("user", query), "payload": updated_payload}, config, stream_mode="values")
+                result = _run_graph(graph, {"messages": ("user", query), "payload": updated_payload}, config, on_progress)
                 log.info(f"Graph invocation completed successfully")
             
                 span.update_trace(output={"response": result})
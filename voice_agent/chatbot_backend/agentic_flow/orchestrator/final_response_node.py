@@ -1,6 +1,7 @@
 from langchain_core.messages import AIMessage, ToolMessage, HumanMessage
 from langgraph.types import Command
 from langgraph.graph import END
+from langgraph.config import get_stream_writer
 
 from app.schemas.request_models import Payload, SupervisorState
 from agentic_flow.guardrail.faq_grounding import validate_contextual_grounding
@@ -12,6 +13,30 @@ from monitoring.logger.logger import Logger
 log = Logger()
 
 
+def emit_answer(message):
+    """
+    Report the customer-facing message on the custom stream as soon as it has passed its checks.
+
+    Streaming callers (see `main._run_graph`) forward it without waiting for the run to
+    wind down; outside a streamed run this does nothing.
+
+    Args:
+        message (str | dict): The message text, or a response dict carrying it under "message".
+    """
+    if hasattr(message, "dict"):
+        message = message.dict()
+    if isinstance(message, dict):
+        message = message.get("message")
+    if not isinstance(message, str) or not message:
+        return
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # Called outside a graph run
+        return
+    writer({"type": "answer", "message": message})
+
+
 def validate_adjacent_tool_message(messages, id, expected_tool_name):
     """
     Validate if the adjacent message is a ToolMessage with a specific tool name.
@@ -157,6 +182,7 @@ def assistance_final_response_node(state: SupervisorState):
         log.info(f"Ban words guard check result: {ban_flag}")
         if flag and regex_flag is True and ban_flag is True:
             log.info("Assistance guard check passed successfully.")
+            emit_answer(state.get("response"))
             return Command(
                 # End flow
                 goto=END
@@ -170,6 +196,7 @@ def assistance_final_response_node(state: SupervisorState):
                 "message": content,
                 "status": "result",
             }
+            emit_answer(response)
             return Command(
                 # update the message history
                 update={"messages": messages,
@@ -278,6 +305,7 @@ def process_final_response(state: SupervisorState, goto_target: str) -> Command:
         content = ("This query response has been completed.")
         log.info("Final response processing completed successfully")
         messages.append(ToolMessage(content=content, tool_call_id=tool_call_id))
+        emit_answer(state.get("response"))
         return Command(update={"messages": messages}, goto=END)
     
     # Fallback if message structure is not as expected
@@ -286,6 +314,7 @@ def process_final_response(state: SupervisorState, goto_target: str) -> Command:
         "message": "I apologize, This query appears to be outside of my scope.",
         "status": "result"
     }
+    emit_answer(response)
     return Command(update={"response" : response}, goto=END)
 
 
@@ -1,6 +1,10 @@
 # app/api/v1/chatbot_routes.py
 
+import asyncio
+import json
+
 from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
 from app.schemas.request_models import Interaction, Payload, InteractionV2
 from app.services.chatbot_service import get_chatbot_response
 # from integrations.external_api_wrapper import get_register_token
@@ -63,4 +67,61 @@ def chatbot_respond(
         result = get_chatbot_response(validated_payload)
         return {"success":False if result.get("error") else True, "data": result} 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/chatbot/respond/stream")
+async def chatbot_respond_stream(
+    interaction: InteractionV2,
+    user_id: str = Header(..., alias="user-id"),
+    session_id: str = Header(..., alias="session-id"),
+    client_id: str = Header(..., alias="client-id"),
+    role: str = Header(..., alias="role"),
+    token: str = Header(None, alias="token"),
+):
+    """
+    Streaming variant of /chatbot/respond as Server-Sent Events.
+
+    Events, in order:
+    - progress: {"type": "progress", "stage": <graph node>} as each agent step finishes
+    - answer:   {"type": "answer", "message": <text>} as soon as the graph run has finished
+    - done:     {"type": "done", "success": bool, "data": <same data as /chatbot/respond>}
+    - error:    {"type": "error", "detail": <text>} instead of done if the request failed
+    """
+    try:
+        validated_payload = Payload(
+            user_id=user_id,
+            session_id=session_id,
+            client_id=client_id,
+            role=role,
+            token=token,
+            interaction=interaction.dict(),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def run():
+        try:
+            result = get_chatbot_response(validated_payload, on_progress=emit)
+            emit({"type": "done", "success": False if result.get("error") else True, "data": result})
+        except Exception as e:
+            log.exception("Streaming chatbot request failed: %s", str(e))
+            emit({"type": "error", "detail": str(e)})
+        finally:
+            emit(None)
+
+    # The graph runs synchronously; keep it off the event loop and relay its events
+    worker = loop.run_in_executor(None, run)
+
+    async def event_stream():
+        while (event := await events.get()) is not None:
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        await worker
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -43,7 +43,7 @@ compiled_graph = graph.compile(checkpointer=checkpointer)
 
 log.info("Chatbot service initialized successfully.")
 
-def get_chatbot_response(payload):
+def get_chatbot_response(payload, on_progress=None):
     """
     Entry point to handle chatbot requests.
 
@@ -53,6 +53,8 @@ def get_chatbot_response(payload):
     Args:
         payload (dict or Pydantic object): The input payload containing interaction metadata,
                                            including 'type' and 'input' fields.
+        on_progress (callable, optional): Receives progress events from the agentic flow
+                                          (see `agentic_flow.main.communicate`).
 
     Returns:
         dict or str: Response from the corresponding chatbot processing engine.
@@ -115,7 +117,7 @@ def get_chatbot_response(payload):
             #     compiled_graph = graph.compile(checkpointer=checkpointer)
 
             #     log.info("PostgreSQL connection established for LangGraph execution.")
-                response = communicate(payload, compiled_graph)
+                response = communicate(payload, compiled_graph, on_progress)
                 log.info("Handled via agentic (LangGraph) flow.")
                 return response
 
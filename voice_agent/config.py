@@ -8,7 +8,107 @@ AZURE_RTOPENAI_DEPLOYMENT   = os.getenv("AZURE_RTOPENAI_DEPLOYMENT")
 AZURE_RTOPENAI_API_VERSION  = os.getenv("AZURE_RTOPENAI_API_VERSION")
 AZURE_RTOPENAI_KEY          = os.getenv("AZURE_RTOPENAI_KEY")
 
-AZURE_WS_URL = (
+# REALTIME_WS_URL points the agent at another realtime server, e.g. mock_realtime_server.py
+AZURE_WS_URL = os.getenv("REALTIME_WS_URL") or (
     f"wss://{AZURE_RTOPENAI_RESOURCE}/openai/realtime"
     f"?deployment={AZURE_RTOPENAI_DEPLOYMENT}&api-version={AZURE_RTOPENAI_API_VERSION}"
 )
+
+# ── Audio capture ─────────────────────────────
+# Seconds of microphone audio retained in memory while recording (0 disables retention)
+CAPTURE_RETENTION_SECONDS = float(os.getenv("CAPTURE_RETENTION_SECONDS", "0"))
+# Frames buffered between the capture thread and the uplink coroutine before the oldest are dropped
+CAPTURE_QUEUE_MAX_FRAMES = int(os.getenv("CAPTURE_QUEUE_MAX_FRAMES", "50"))
+
+# ── Audio uplink ──────────────────────────────
+# Milliseconds of audio coalesced into one input_audio_buffer.append event (0 sends every chunk)
+UPLINK_BATCH_MS = int(os.getenv("UPLINK_BATCH_MS", "100"))
+# Upper bound on how long a partial batch waits before it is sent anyway
+UPLINK_MAX_LATENCY_MS = int(os.getenv("UPLINK_MAX_LATENCY_MS", "100"))
+
+# ── Local voice activity gate ─────────────────
+# Drop silent frames on the client before upload (server_vad still makes the turn decisions)
+LOCAL_VAD_ENABLED = os.getenv("LOCAL_VAD_ENABLED", "false").lower() == "true"
+LOCAL_VAD_THRESHOLD_DB = float(os.getenv("LOCAL_VAD_THRESHOLD_DB", "-45"))
+
+# ── Audio playout ─────────────────────────────
+# Jitter buffer depth before playback starts; adapts between these bounds with observed jitter
+PLAYOUT_MIN_TARGET_MS = int(os.getenv("PLAYOUT_MIN_TARGET_MS", "40"))
+PLAYOUT_MAX_TARGET_MS = int(os.getenv("PLAYOUT_MAX_TARGET_MS", "300"))
+# Hard cap on buffered response audio; the oldest audio is dropped beyond it
+PLAYOUT_MAX_BUFFER_MS = int(os.getenv("PLAYOUT_MAX_BUFFER_MS", "60000"))
+
+# ── Multi-call gateway ────────────────────────
+# The ingress has no authentication; bind a public interface only behind something that has
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8765"))
+# Concurrent caller sessions accepted before new connections are refused
+GATEWAY_MAX_CALLS = int(os.getenv("GATEWAY_MAX_CALLS", "200"))
+# Threads shared by all calls for synchronous tools
+GATEWAY_TOOL_WORKERS = int(os.getenv("GATEWAY_TOOL_WORKERS", "16"))
+
+# ── Pre-warmed realtime sessions (gateway) ────
+# Sessions kept connected and configured ahead of incoming calls (0 disables the pool)
+REALTIME_POOL_SIZE = int(os.getenv("REALTIME_POOL_SIZE", "0"))
+# Pooled sessions older than this are replaced before the server expires them
+REALTIME_POOL_MAX_AGE_S = float(os.getenv("REALTIME_POOL_MAX_AGE_S", "600"))
+REALTIME_POOL_HEALTH_INTERVAL_S = float(os.getenv("REALTIME_POOL_HEALTH_INTERVAL_S", "30"))
+# Generate the greeting while the session waits in the pool, so callers hear it immediately
+REALTIME_POOL_PRIME_GREETING = os.getenv("REALTIME_POOL_PRIME_GREETING", "false").lower() == "true"
+
+# ── Reconnect and resume ──────────────────────
+# Total time spent trying to re-establish a dropped realtime session before giving up
+RECONNECT_BUDGET_S = float(os.getenv("RECONNECT_BUDGET_S", "30"))
+RECONNECT_INITIAL_BACKOFF_S = float(os.getenv("RECONNECT_INITIAL_BACKOFF_S", "0.5"))
+RECONNECT_MAX_BACKOFF_S = float(os.getenv("RECONNECT_MAX_BACKOFF_S", "8"))
+# Bounds on the conversation summary replayed into a resumed session
+RESUME_MAX_TURNS = int(os.getenv("RESUME_MAX_TURNS", "20"))
+RESUME_MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", "4000"))
+
+# ── Tool execution ────────────────────────────
+# Threads for synchronous tools when the client is not given a shared pool
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "4"))
+# Default per-tool timeout, and per-tool overrides as "name=seconds,name=seconds"
+TOOL_TIMEOUT_S = float(os.getenv("TOOL_TIMEOUT_S", "15"))
+TOOL_TIMEOUTS_S = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        entry.split("=", 1)
+        for entry in os.getenv("TOOL_TIMEOUTS_S", "query_chatbot_backend=90").split(",")
+        if "=" in entry
+    )
+}
+# Backend chatbot queries one call may have running at once; further queries wait
+BACKEND_MAX_CONCURRENT_PER_CALL = int(os.getenv("BACKEND_MAX_CONCURRENT_PER_CALL", "2"))
+
+# ── Backend chatbot HTTP client ───────────────
+# Pooled keep-alive client shared by all backend queries (HTTP/2 needs the 'h2' package)
+BACKEND_HTTP2 = os.getenv("BACKEND_HTTP2", "false").lower() == "true"
+BACKEND_MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", "100"))
+BACKEND_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("BACKEND_MAX_KEEPALIVE_CONNECTIONS", "20"))
+BACKEND_KEEPALIVE_EXPIRY_S = float(os.getenv("BACKEND_KEEPALIVE_EXPIRY_S", "30"))
+# Connecting should be quick; an agentic answer can take a while to generate
+BACKEND_CONNECT_TIMEOUT_S = float(os.getenv("BACKEND_CONNECT_TIMEOUT_S", "3"))
+BACKEND_READ_TIMEOUT_S = float(os.getenv("BACKEND_READ_TIMEOUT_S", "60"))
+# Retries for failures to connect and 502/503 responses from a proxy in front of the backend
+# (never for dropped connections or 504s, which may come after the backend took the question)
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "2"))
+BACKEND_RETRY_BACKOFF_S = float(os.getenv("BACKEND_RETRY_BACKOFF_S", "0.2"))
+# Use the backend's streaming endpoint so answers arrive as soon as the agent produces them
+BACKEND_STREAMING = os.getenv("BACKEND_STREAMING", "true").lower() == "true"
+
+# ── Filler audio ──────────────────────────────
+# Pre-rendered clips played while the backend tool runs, instead of a "please wait" model turn
+FILLER_AUDIO_ENABLED = os.getenv("FILLER_AUDIO_ENABLED", "true").lower() == "true"
+FILLER_AUDIO_DIR = os.getenv("FILLER_AUDIO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "filler_audio"))
+FILLER_DEFAULT_LANGUAGE = os.getenv("FILLER_DEFAULT_LANGUAGE", "en")
+# Silence between consecutive filler clips
+FILLER_GAP_S = float(os.getenv("FILLER_GAP_S", "4"))
+
+# ── Turn latency metrics ──────────────────────
+# JSON lines file that gets one line per finished user turn with its stage latencies (empty disables)
+TURN_METRICS_PATH = os.getenv("TURN_METRICS_PATH", "")
+
+# ── Session recording ─────────────────────────
+# Directory that gets one recording per realtime session for replay_session.py (empty disables)
+SESSION_RECORD_DIR = os.getenv("SESSION_RECORD_DIR", "")
@@ -0,0 +1,166 @@
+"""
+Pre-rendered filler clips ("one moment please") played while a slow tool runs.
+
+Clips live under FILLER_AUDIO_DIR as <language>/<name>.wav (or headerless
+.pcm), PCM16 mono at 24 kHz, i.e. the realtime output format. No clips ship
+with the repo (they must be in the deployment's own voice); render
+FILLER_PHRASES once against the configured realtime deployment with:
+
+    python filler_audio.py --voice verse
+
+Without clips the agent falls back to asking the model for a short status line.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import wave
+
+from config import FILLER_AUDIO_DIR, FILLER_DEFAULT_LANGUAGE
+from logger import logger
+
+SAMPLE_RATE = 24000
+SAMPLE_WIDTH = 2
+
+# Phrases rendered by render_fillers(), per language code
+FILLER_PHRASES = {
+    "en": [
+        "Sure, let me check that for you.",
+        "One moment, I'm pulling up the details.",
+        "Still working on it, thanks for waiting.",
+        "Almost there, just a few more seconds.",
+    ],
+    "hi": [
+        "ज़रूर, मैं आपके लिए देख रहा हूँ।",
+        "एक पल, मैं जानकारी निकाल रहा हूँ।",
+        "बस थोड़ा सा और समय, धन्यवाद।",
+    ],
+}
+
+# Unicode block -> language code, for guessing the caller's language from a transcript
+SCRIPT_LANGUAGES = [
+    ((0x0900, 0x097F), "hi"),  # Devanagari
+    ((0x0980, 0x09FF), "bn"),  # Bengali
+    ((0x0A80, 0x0AFF), "gu"),  # Gujarati
+    ((0x0B80, 0x0BFF), "ta"),  # Tamil
+    ((0x0C00, 0x0C7F), "te"),  # Telugu
+    ((0x0C80, 0x0CFF), "kn"),  # Kannada
+]
+
+
+def detect_language(text, default=FILLER_DEFAULT_LANGUAGE):
+    """Guess a language code from the script of `text`; `default` for Latin or empty text."""
+    for char in text:
+        code = ord(char)
+        for (low, high), language in SCRIPT_LANGUAGES:
+            if low <= code <= high:
+                return language
+    return default
+
+
+def load_clip(path):
+    """Read a filler clip as PCM16 mono 24 kHz bytes, or None if it is in another format."""
+    if path.endswith(".pcm"):
+        with open(path, "rb") as f:
+            return f.read()
+    with wave.open(path, "rb") as wav:
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, SAMPLE_WIDTH):
+            logger.warning(f"🎵 Skipping filler clip {path}: expected PCM16 mono {SAMPLE_RATE} Hz")
+            return None
+        return wav.readframes(wav.getnframes())
+
+
+class FillerAudioCache:
+    """
+    In-memory filler clips by language, loaded once at startup. pick() never
+    returns the same clip twice in a row for a language.
+    """
+    def __init__(self, directory=FILLER_AUDIO_DIR, default_language=FILLER_DEFAULT_LANGUAGE):
+        self.default_language = default_language
+        self.clips = {}  # language -> [PCM16 bytes]
+        self._last = {}
+        if os.path.isdir(directory):
+            for language in sorted(os.listdir(directory)):
+                folder = os.path.join(directory, language)
+                if not os.path.isdir(folder):
+                    continue
+                clips = [load_clip(os.path.join(folder, name)) for name in sorted(os.listdir(folder))
+                         if name.endswith((".wav", ".pcm"))]
+                clips = [clip for clip in clips if clip]
+                if clips:
+                    self.clips[language] = clips
+        logger.info(f"🎵 Filler audio: {', '.join(f'{lang}={len(c)}' for lang, c in self.clips.items()) or 'none'}")
+        if not self.clips:
+            logger.info(f"🎵 No filler clips in {directory}; render them with: python filler_audio.py")
+
+    def __bool__(self):
+        return bool(self.clips)
+
+    def pick(self, language=None):
+        """A clip in `language`, falling back to the default language; None if there is none."""
+        if language not in self.clips:
+            language = self.default_language if self.default_language in self.clips else next(iter(self.clips), None)
+        if language is None:
+            return None
+        clips = self.clips[language]
+        choices = [i for i in range(len(clips)) if i != self._last.get(language)] or [0]
+        index = random.choice(choices)
+        self._last[language] = index
+        return clips[index]
+
+
+async def render_fillers(directory=FILLER_AUDIO_DIR, voice="verse", phrases=FILLER_PHRASES):
+    """Synthesize FILLER_PHRASES with the realtime model's own voice and save them as WAV clips."""
+    from realtime_client import build_session_config, open_realtime_session
+
+    session_config = build_session_config(
+        "Repeat the user's text exactly as written, in its language, with a calm and friendly tone.",
+        voice,
+        turn_detection=None,
+    )
+    # A clip is spoken text only; the agent's tools would let the model answer with a call instead
+    session_config.update(tools=[], tool_choice="none")
+    ws = await open_realtime_session(session_config)
+    try:
+        for language, texts in phrases.items():
+            os.makedirs(os.path.join(directory, language), exist_ok=True)
+            for number, text in enumerate(texts, 1):
+                await ws.send(json.dumps({
+                    "type": "conversation.item.create",
+                    "item": {"type": "message", "role": "user", "content": [{"type": "input_text", "text": text}]}
+                }))
+                await ws.send(json.dumps({"type": "response.create", "response": {"modalities": ["audio", "text"]}}))
+
+                audio = bytearray()
+                async for message in ws:
+                    event = json.loads(message)
+                    if event["type"] == "response.audio.delta":
+                        audio += base64.b64decode(event["delta"])
+                    elif event["type"] == "response.done":
+                        break
+                    elif event["type"] == "error":
+                        logger.error(f"🎵 Rendering {text!r} failed: {event.get('error')}")
+                        break
+                if not audio:
+                    logger.warning(f"🎵 No audio for {text!r}; skipped")
+                    continue
+
+                path = os.path.join(directory, language, f"filler_{number:02d}.wav")
+                with wave.open(path, "wb") as wav:
+                    wav.setnchannels(1)
+                    wav.setsampwidth(SAMPLE_WIDTH)
+                    wav.setframerate(SAMPLE_RATE)
+                    wav.writeframes(bytes(audio))
+                logger.info(f"🎵 Rendered {path} ({len(audio) / (SAMPLE_RATE * SAMPLE_WIDTH):.1f} s)")
+    finally:
+        await ws.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render filler clips with the realtime model's voice")
+    parser.add_argument("--voice", default="verse")
+    parser.add_argument("--directory", default=FILLER_AUDIO_DIR)
+    cli_args = parser.parse_args()
+    asyncio.run(render_fillers(cli_args.directory, cli_args.voice))
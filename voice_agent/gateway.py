@@ -0,0 +1,317 @@
+"""
+Multi-call realtime gateway.
+
+Hosts many RealtimeClient sessions on one event loop. Each caller connects to
+the local ingress WebSocket and gets its own upstream Azure realtime session
+and its own backend chatbot `session-id`, generated by the gateway so that a
+caller cannot attach to another call's backend conversation. The ingress is
+not authenticated and listens on localhost unless GATEWAY_HOST says otherwise.
+
+Ingress protocol (one WebSocket per call):
+- connect to ws://<host>:<port>/?format=<audio format>
+  format is one of the audio_codecs.AUDIO_FORMATS names (default pcm16, i.e.
+  PCM16 mono 24 kHz); g711_ulaw / g711_alaw (8 kHz) suit phone legs and go to
+  the realtime API unconverted, other formats are resampled to and from 24 kHz
+  pcm16.
+- caller -> gateway: binary messages are audio frames in the call's format,
+  text messages are JSON control events: {"type": "hangup"}
+- gateway -> caller: binary messages are response audio in the call's format,
+  text messages are JSON control events:
+  {"type": "audio.done"}  no more audio for the current response
+  {"type": "clear"}       caller barged in; drop any audio not yet played
+
+GET /metrics on the same port returns per-turn latency percentiles over all
+calls and call counts in the Prometheus text format.
+"""
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlparse, parse_qs
+
+import websockets
+
+from audio_buffers import offer_latest
+from audio_codecs import Transcoder, negotiate_format
+from chat_wrapper import close_client
+from config import (
+    CAPTURE_QUEUE_MAX_FRAMES,
+    GATEWAY_HOST,
+    GATEWAY_PORT,
+    GATEWAY_MAX_CALLS,
+    GATEWAY_TOOL_WORKERS,
+    REALTIME_POOL_SIZE,
+    FILLER_AUDIO_ENABLED,
+)
+from filler_audio import FillerAudioCache
+from instructions import INSTRUCTIONS
+from logger import LIFECYCLE, logger
+from metrics import TurnLatencyStats
+from realtime_client import RealtimeClient, build_session_config
+from session_pool import RealtimeSessionPool
+
+
+class CallAudioBridge:
+    """
+    Stands in for AudioHandler on a gateway call. Response audio is forwarded
+    to the caller's socket instead of a sound card, converted from the
+    realtime `upstream_format` to the caller's format if they differ. The
+    caller plays audio at 1x, so the played position of the current item is
+    estimated from wall clock time since its first chunk was sent.
+    """
+    def __init__(self, caller_ws, call_stats, caller_format, upstream_format):
+        self.caller_ws = caller_ws
+        self.call_stats = call_stats
+        self.rate = upstream_format.sample_rate
+        self.channels = 1
+        self.sample_width = upstream_format.sample_width
+        self.bytes_per_ms = upstream_format.bytes_per_ms
+        self._to_caller = Transcoder(upstream_format, caller_format)
+
+        self._outbox = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_to_caller())
+        self._playout_ends_at = 0.0  # When the caller finishes playing what was sent
+        self._item = None  # (item_id, content_index, playout start, audio ms sent)
+        self._tagged_sent = False  # Tagged audio sent since the last audio.done
+        self.on_playback = None  # As AudioHandler.on_playback, with estimated caller playout times
+
+    @property
+    def is_streaming(self):
+        return time.monotonic() < self._playout_ends_at
+
+    async def _write_to_caller(self):
+        try:
+            while True:
+                message = await self._outbox.get()
+                await self.caller_ws.send(message)
+        except websockets.ConnectionClosed:
+            pass
+
+    def start_output_stream(self):
+        pass  # The caller owns its playback device
+
+    def add_streaming_audio(self, audio_data, item_id=None, content_index=0):
+        now = time.monotonic()
+        chunk_ms = len(audio_data) / self.bytes_per_ms
+        starts_at = max(now, self._playout_ends_at)
+        # Untagged audio (a filler clip) belongs to no conversation item and is not counted into one
+        if item_id is not None:
+            self._tagged_sent = True
+            if self._item is None or self._item[0] != item_id:
+                self._item = (item_id, content_index, starts_at, 0.0)
+                if self.on_playback:
+                    # The caller hears it once what was sent before (a filler clip, say) has played
+                    self.on_playback("first_sample", starts_at)
+            item_id, content_index, item_start, sent_ms = self._item
+            self._item = (item_id, content_index, item_start, sent_ms + chunk_ms)
+        self._playout_ends_at = starts_at + chunk_ms / 1000
+
+        caller_audio = self._to_caller.convert(audio_data)
+        self.call_stats.audio_out_bytes += len(caller_audio)
+        self._outbox.put_nowait(caller_audio)
+
+    def mark_audio_response_complete(self):
+        self._outbox.put_nowait(json.dumps({"type": "audio.done"}))
+        if self._tagged_sent and self.on_playback:
+            self.on_playback("finished", max(time.monotonic(), self._playout_ends_at))
+        self._tagged_sent = False
+
+    def interrupt_playback(self, on_silenced=None):
+        """
+        Drop queued audio and tell the caller to clear its playout buffer.
+        Returns the estimated played position like AudioHandler.interrupt_playback().
+        """
+        if not self.is_streaming:
+            return False
+
+        position = None
+        if self._item is not None:
+            item_id, content_index, item_start, sent_ms = self._item
+            played_ms = (time.monotonic() - item_start) * 1000
+            if played_ms < sent_ms:  # Otherwise the item played out and only untagged audio is left
+                position = (item_id, content_index, max(0, int(played_ms)))
+
+        while not self._outbox.empty():
+            self._outbox.get_nowait()
+        self._outbox.put_nowait(json.dumps({"type": "clear"}))
+        self._playout_ends_at = 0.0
+        self._item = None
+        self._tagged_sent = False
+        if on_silenced:
+            on_silenced(time.monotonic())
+        return position
+
+    def stop_streaming_playback(self):
+        self.interrupt_playback()
+
+    def cleanup(self):
+        self._writer_task.cancel()
+
+
+class CallStats:
+    """Per-call resource accounting."""
+    def __init__(self, call_id, session_id, audio_format="pcm16"):
+        self.call_id = call_id
+        self.session_id = session_id
+        self.audio_format = audio_format
+        self.started_at = time.monotonic()
+        self.audio_in_bytes = 0
+        self.audio_out_bytes = 0
+
+    def summary(self, client=None):
+        summary = {
+            "call_id": self.call_id,
+            "session_id": self.session_id,
+            "audio_format": self.audio_format,
+            "duration_s": round(time.monotonic() - self.started_at, 1),
+            "audio_in_bytes": self.audio_in_bytes,
+            "audio_out_bytes": self.audio_out_bytes,
+        }
+        if client is not None:
+            summary["upstream_events_in"] = sum(h.count for h in client.event_stats.histograms.values())
+            summary["upstream_audio_appends"] = client.uplink.events.total
+            summary["tool_calls"] = client.tool_calls
+            summary["tools"] = client.tool_runner.stats()
+            summary["backend_queries"] = client.backend_queries.stats()
+            summary["turns"] = client.turns.stats.summary()
+        return summary
+
+
+class RealtimeGateway:
+    """
+    Accepts caller audio streams on a local WebSocket server and maps each one
+    to its own RealtimeClient. All calls share the event loop and one bounded
+    thread pool for synchronous tools.
+    """
+    def __init__(self, host=GATEWAY_HOST, port=GATEWAY_PORT, max_calls=GATEWAY_MAX_CALLS,
+                 tool_workers=GATEWAY_TOOL_WORKERS, voice="verse"):
+        self.host = host
+        self.port = port
+        self.max_calls = max_calls
+        self.voice = voice
+        self.tool_executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="voice-tool")
+        self.calls = {}  # call_id -> (CallStats, RealtimeClient)
+        self.completed_calls = 0
+        self.fillers = FillerAudioCache() if FILLER_AUDIO_ENABLED else None  # Shared by all calls
+        self.turn_stats = TurnLatencyStats(max_samples=10000)  # Turns of every call
+        self.session_pool = None
+        if REALTIME_POOL_SIZE > 0:
+            self.session_pool = RealtimeSessionPool(build_session_config(INSTRUCTIONS, voice))
+
+    def stats(self):
+        return {
+            "active_calls": len(self.calls),
+            "completed_calls": self.completed_calls,
+            "session_pool": self.session_pool.stats() if self.session_pool else None,
+            "turns": self.turn_stats.summary(),
+            "calls": [call_stats.summary(client) for call_stats, client in self.calls.values()],
+        }
+
+    def metrics_text(self):
+        """Gateway metrics in the Prometheus text format."""
+        return (
+            "# TYPE voice_gateway_active_calls gauge\n"
+            f"voice_gateway_active_calls {len(self.calls)}\n"
+            "# TYPE voice_gateway_completed_calls_total counter\n"
+            f"voice_gateway_completed_calls_total {self.completed_calls}\n"
+            + self.turn_stats.prometheus()
+        )
+
+    def _process_request(self, connection, request):
+        """Answer GET /metrics over plain HTTP; any other path goes on to the WebSocket handshake."""
+        if urlparse(request.path).path == "/metrics":
+            return connection.respond(HTTPStatus.OK, self.metrics_text())
+        return None
+
+    async def _handle_caller(self, caller_ws):
+        if len(self.calls) >= self.max_calls:
+            logger.warning(f"📞 Rejecting caller: gateway at capacity ({self.max_calls} calls)")
+            await caller_ws.close(1013, "Gateway at capacity")
+            return
+
+        query = parse_qs(urlparse(caller_ws.request.path).query)
+        session_id = str(uuid.uuid4())
+        try:
+            caller_format, upstream_format = negotiate_format(query.get("format", ["pcm16"])[0])
+        except ValueError as e:
+            logger.warning(f"📞 Rejecting caller: {e}")
+            await caller_ws.close(1003, str(e))
+            return
+        call_id = str(uuid.uuid4())
+        call_stats = CallStats(call_id, session_id, caller_format.name)
+
+        to_upstream = Transcoder(caller_format, upstream_format)
+        bridge = CallAudioBridge(caller_ws, call_stats, caller_format, upstream_format)
+        client = RealtimeClient(
+            instructions=INSTRUCTIONS,
+            voice=self.voice,
+            audio_handler=bridge,
+            session_id=session_id,
+            tool_executor=self.tool_executor,
+            fillers=self.fillers,
+            audio_format=upstream_format.name,
+            turn_sinks=(self.turn_stats.record,),
+        )
+        self.calls[call_id] = (call_stats, client)
+        logger.info(f"📞 Call {call_id} started (session {session_id}, {len(self.calls)} active)",
+                    extra=LIFECYCLE)
+
+        frames = asyncio.Queue(maxsize=CAPTURE_QUEUE_MAX_FRAMES)
+        receive_task = None
+        uplink_task = None
+        try:
+            # Pooled sessions are configured for pcm16
+            pooled_session = None
+            if self.session_pool and upstream_format.name == "pcm16":
+                pooled_session = await self.session_pool.acquire()
+            await client.connect(pooled_session)
+            receive_task = asyncio.create_task(client.receive_events())
+            uplink_task = asyncio.create_task(client.stream_audio(frames))
+
+            async for message in caller_ws:
+                if isinstance(message, bytes):
+                    call_stats.audio_in_bytes += len(message)
+                    offer_latest(frames, to_upstream.convert(message))
+                elif json.loads(message).get("type") == "hangup":
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"📞 Call {call_id} failed: {e}")
+        finally:
+            offer_latest(frames, None)
+            if uplink_task:
+                await asyncio.wait([uplink_task], timeout=1.0)
+            if receive_task:
+                receive_task.cancel()
+            await client.cleanup()
+            self.calls.pop(call_id, None)
+            self.completed_calls += 1
+            logger.info(f"📞 Call {call_id} ended: {call_stats.summary(client)}", extra=LIFECYCLE)
+
+    async def serve_forever(self, ready=None):
+        """Serve callers until cancelled; `ready` (an asyncio.Event) is set once the port is listening."""
+        if self.session_pool:
+            await self.session_pool.start()
+        async with websockets.serve(self._handle_caller, self.host, self.port, process_request=self._process_request):
+            logger.info(f"📞 Realtime gateway listening on ws://{self.host}:{self.port} "
+                        f"(max {self.max_calls} calls)")
+            if ready:
+                ready.set()
+            await asyncio.Future()
+
+    async def shutdown(self):
+        if self.session_pool:
+            await self.session_pool.close()
+        self.tool_executor.shutdown(wait=False, cancel_futures=True)
+        await close_client()
+
+
+async def run_gateway():
+    gateway = RealtimeGateway()
+    try:
+        await gateway.serve_forever()
+    finally:
+        await gateway.shutdown()
@@ -0,0 +1,195 @@
+"""
+Load test for the realtime gateway: many simulated callers at once.
+
+Each caller connects to the gateway ingress, streams paced audio frames like a
+phone leg (a tone while "talking", silence otherwise) and, for every turn,
+measures the time from the end of its speech to the first response audio and
+waits for the response to finish. The speech-end latency includes the server
+VAD silence window, as it does for a real caller.
+
+    # Gateway and mock realtime API in this process; no Azure deployment needed
+    python load_test.py --in-process --calls 200 --turns 3
+    # Against a gateway that is already running
+    python load_test.py --url ws://localhost:8765 --calls 50
+
+With --in-process the mock server options of mock_realtime_server.py
+(--first-delta-ms, --token-rate, --script, ...) shape the simulated model.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+import websockets
+
+from audio_codecs import AUDIO_FORMATS, encode_pcm16
+from logger import logger
+from metrics import LatencyStats
+from mock_realtime_server import add_server_arguments, server_from_arguments
+
+FRAME_MS = 20
+SPEECH_HZ = 300
+
+
+class LoadTestResults:
+    def __init__(self):
+        self.connect = LatencyStats(max_samples=100000)
+        self.first_audio = LatencyStats(max_samples=100000)
+        self.turn = LatencyStats(max_samples=100000)
+        self.completed_calls = 0
+        self.failed_calls = 0
+        self.timed_out_turns = 0
+
+    def summary(self):
+        return {
+            "completed_calls": self.completed_calls,
+            "failed_calls": self.failed_calls,
+            "timed_out_turns": self.timed_out_turns,
+            "connect": self.connect.summary(),
+            "speech_end_to_first_audio": self.first_audio.summary(),
+            "speech_end_to_audio_done": self.turn.summary(),
+        }
+
+
+def make_frame(audio_format, amplitude):
+    """One FRAME_MS frame of a SPEECH_HZ tone (silence for amplitude 0) in `audio_format`."""
+    t = np.arange(audio_format.sample_rate * FRAME_MS // 1000) / audio_format.sample_rate
+    samples = (amplitude * 32767 * np.sin(2 * np.pi * SPEECH_HZ * t)).astype(np.int16)
+    return encode_pcm16(samples, audio_format.encoding)
+
+
+class SimulatedCaller:
+    """One caller: a paced audio pump and a reader timing the gateway's responses."""
+    def __init__(self, number, url, audio_format, results):
+        self.number = number
+        self.url = f"{url}/?format={audio_format.name}"
+        self.results = results
+        self.speech_frame = make_frame(audio_format, 0.3)
+        self.silence_frame = make_frame(audio_format, 0.0)
+
+        self.speaking = False
+        self.speech_ended_at = None  # Set while waiting for the first audio of a turn
+        self.audio_done = asyncio.Event()
+
+    async def _pump(self, ws):
+        next_at = time.monotonic()
+        while True:
+            await ws.send(self.speech_frame if self.speaking else self.silence_frame)
+            next_at += FRAME_MS / 1000
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    async def _read(self, ws):
+        async for message in ws:
+            if isinstance(message, bytes):
+                if self.speech_ended_at is not None:
+                    self.results.first_audio.record((time.monotonic() - self.speech_ended_at) * 1000)
+                    self.speech_ended_at = None
+            elif json.loads(message).get("type") == "audio.done":
+                self.audio_done.set()
+
+    async def run(self, turns, speech_s, turn_timeout_s):
+        started_at = time.monotonic()
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                self.results.connect.record((time.monotonic() - started_at) * 1000)
+                pump = asyncio.create_task(self._pump(ws))
+                reader = asyncio.create_task(self._read(ws))
+                try:
+                    for _ in range(turns):
+                        self.audio_done.clear()
+                        self.speaking = True
+                        await asyncio.sleep(speech_s)
+                        self.speaking = False
+                        ended_at = self.speech_ended_at = time.monotonic()
+                        try:
+                            await asyncio.wait_for(self.audio_done.wait(), turn_timeout_s)
+                        except asyncio.TimeoutError:
+                            self.results.timed_out_turns += 1
+                            logger.warning(f"🧪 Caller {self.number}: no response within {turn_timeout_s:g} s")
+                            break
+                        self.results.turn.record((time.monotonic() - ended_at) * 1000)
+                    await ws.send(json.dumps({"type": "hangup"}))
+                finally:
+                    pump.cancel()
+                    reader.cancel()
+            self.results.completed_calls += 1
+        except (OSError, websockets.ConnectionClosed) as e:
+            self.results.failed_calls += 1
+            logger.warning(f"🧪 Caller {self.number} failed: {e}")
+
+
+async def start_server(server, background):
+    """Start `server.serve_forever()` as a task in `background` and wait until it is listening."""
+    ready = asyncio.Event()
+    task = asyncio.create_task(server.serve_forever(ready))
+    background.append(task)
+    await asyncio.wait({task, asyncio.create_task(ready.wait())}, return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        task.result()  # Could not listen; raises
+
+
+async def run_load_test(cli_args):
+    results = LoadTestResults()
+    background = []
+    mock = gateway = None
+    url = cli_args.url
+    if cli_args.in_process:
+        mock = server_from_arguments(cli_args, "127.0.0.1", cli_args.mock_port)
+        await start_server(mock, background)
+
+        from gateway import RealtimeGateway  # After REALTIME_WS_URL is set, see __main__
+        gateway = RealtimeGateway(host="127.0.0.1", port=cli_args.gateway_port,
+                                  max_calls=max(cli_args.calls, 1))
+        await start_server(gateway, background)
+        url = f"ws://127.0.0.1:{cli_args.gateway_port}"
+
+    audio_format = AUDIO_FORMATS[cli_args.format]
+    logger.info(f"🧪 Starting {cli_args.calls} calls of {cli_args.turns} turn(s) against {url}")
+    started_at = time.monotonic()
+    callers = []
+    for number in range(cli_args.calls):
+        caller = SimulatedCaller(number, url, audio_format, results)
+        callers.append(asyncio.create_task(caller.run(cli_args.turns, cli_args.speech_s, cli_args.turn_timeout_s)))
+        if cli_args.ramp_s > 0:
+            await asyncio.sleep(cli_args.ramp_s / cli_args.calls)
+    await asyncio.gather(*callers)
+    if gateway is not None:
+        # Let the gateway finish tearing down the calls that just hung up
+        deadline = time.monotonic() + 10
+        while gateway.calls and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    summary = {"duration_s": round(time.monotonic() - started_at, 1), **results.summary()}
+    if mock is not None:
+        summary["mock"] = mock.stats()
+    if gateway is not None:
+        summary["gateway_completed_calls"] = gateway.completed_calls
+        await gateway.shutdown()
+    for task in background:
+        task.cancel()
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the realtime gateway with simulated callers")
+    parser.add_argument("--url", default="ws://localhost:8765", help="Gateway ingress URL (ignored with --in-process)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run the gateway and a mock realtime API in this process")
+    parser.add_argument("--gateway-port", type=int, default=8766)
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--calls", type=int, default=100, help="Concurrent simulated calls")
+    parser.add_argument("--turns", type=int, default=3, help="Caller turns per call")
+    parser.add_argument("--speech-s", type=float, default=1.5, help="Caller speech per turn")
+    parser.add_argument("--ramp-s", type=float, default=5.0, help="Spread call starts over this many seconds")
+    parser.add_argument("--turn-timeout-s", type=float, default=30.0)
+    parser.add_argument("--format", default="pcm16", choices=sorted(AUDIO_FORMATS), help="Caller audio format")
+    add_server_arguments(parser)
+    cli_args = parser.parse_args()
+
+    if cli_args.in_process:
+        # config reads this at import, so it must be set before the gateway is imported
+        os.environ["REALTIME_WS_URL"] = f"ws://127.0.0.1:{cli_args.mock_port}"
+    asyncio.run(run_load_test(cli_args))
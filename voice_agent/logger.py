@@ -1,10 +1,107 @@
 # voice_agent/logger.py
+"""
+Logging for the voice agent.
+
+Log calls only put the record on a queue; a background QueueListener thread
+formats and writes it, so the event loop and the audio thread never wait on
+the terminal. On the way in, records below WARNING are rate limited per call
+site (logger, file and line): a site may log LOG_RATE_PER_SITE messages per
+second with bursts of LOG_BURST_PER_SITE, and how many were dropped is noted
+on its next message. Once-per-call lifecycle messages (call started and
+ended, end-of-session stats) pass `extra=LIFECYCLE` and are never dropped,
+however many calls end at once. Messages longer than LOG_MAX_MESSAGE_CHARS are cut when
+written.
+
+These settings come straight from the environment, not config.py, so that
+importing the logger never loads the agent configuration early.
+"""
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Messages per second each call site may log below WARNING (0 disables rate limiting)
+LOG_RATE_PER_SITE = float(os.getenv("LOG_RATE_PER_SITE", "5"))
+LOG_BURST_PER_SITE = float(os.getenv("LOG_BURST_PER_SITE", "20"))
+# Longer messages are cut to this many characters (0 disables truncation)
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+
+# extra= for messages exempt from the rate limit
+LIFECYCLE = {"rate_limit": False}
+
+
+class CallSiteRateLimit(logging.Filter):
+    """
+    Token bucket per call site for records below WARNING; warnings, errors and
+    records logged with extra=LIFECYCLE always pass.
+    """
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # (logger, path, line) -> [tokens, last refill, suppressed since last pass]
+        self._lock = threading.Lock()  # Records come from the event loop and the audio thread
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.WARNING or not getattr(record, "rate_limit", True):
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                bucket = self._buckets[site] = [self.burst, record.created, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (record.created - bucket[1]) * self.rate)
+                bucket[1] = record.created
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s  %(levelname)-8s  %(message)s",
+class TruncatingFormatter(logging.Formatter):
+    """Cuts messages to `max_chars` and notes messages its call site had suppressed."""
+    def __init__(self, fmt=None, datefmt=None, max_chars=0):
+        super().__init__(fmt, datefmt)
+        self.max_chars = max_chars
+
+    def formatMessage(self, record):
+        message = record.message
+        if self.max_chars and len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}… [{len(message) - self.max_chars} more chars]"
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" (+{suppressed} similar suppressed)"
+        record.message = message
+        return super().formatMessage(record)
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The queue never leaves the process, so the record is queued as is and
+        # formatted on the listener thread instead of by the caller
+        return record
+
+
+_queue = queue.SimpleQueue()
+_console = logging.StreamHandler()
+_console.setFormatter(TruncatingFormatter(
+    "%(asctime)s  %(levelname)-8s  %(message)s",
     datefmt="%H:%M:%S",
-)
+    max_chars=LOG_MAX_MESSAGE_CHARS,
+))
+_queue_handler = _InProcessQueueHandler(_queue)
+_queue_handler.addFilter(CallSiteRateLimit(LOG_RATE_PER_SITE, LOG_BURST_PER_SITE))
+
+logging.basicConfig(level=LOG_LEVEL, handlers=[_queue_handler])
+
+_listener = logging.handlers.QueueListener(_queue, _console)
+_listener.start()
+atexit.register(_listener.stop)  # Writes out whatever is still queued
 
 logger = logging.getLogger("realtime-agent")
@@ -1,6 +1,10 @@
 from realtime_client import RealtimeClient
 from instructions import INSTRUCTIONS
+from chat_wrapper import close_client
+from audio_handler import AudioHandler
+from audio_backends import FileSource, NullSink
 
+import argparse
 import asyncio
 import logging
 from logger import logger
@@ -8,14 +12,39 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-async def main():
-    client = RealtimeClient(instructions=INSTRUCTIONS, voice="verse")
+async def main(cli_args):
+    source = sink = None
+    if cli_args.input_file:
+        source = FileSource(cli_args.input_file, speed=cli_args.speed)
+    if cli_args.null_output or cli_args.record_output:
+        sink = NullSink(speed=cli_args.speed, record_path=cli_args.record_output)
+
+    client = RealtimeClient(instructions=INSTRUCTIONS, voice="verse", audio_handler=AudioHandler(source=source, sink=sink))
     try:
-        await client.run()
+        if source is not None:
+            await client.run_scripted()
+        else:
+            await client.run()
     except Exception as e:
         print(f"❌ Fatal Error: {e}")
     finally:
+        await close_client()
         print("✅ Exiting.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Realtime voice agent")
+    parser.add_argument("--gateway", action="store_true",
+                        help="Serve many caller audio streams over a local WebSocket instead of the local microphone")
+    parser.add_argument("--input-file",
+                        help="Use a WAV/raw PCM16 24 kHz mono file as the microphone and run non-interactively")
+    parser.add_argument("--null-output", action="store_true", help="Discard response audio instead of playing it")
+    parser.add_argument("--record-output", help="Write response audio to this WAV file instead of playing it")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Pace file input and null output at this multiple of real time (0 = unpaced)")
+    cli_args = parser.parse_args()
+
+    if cli_args.gateway:
+        from gateway import run_gateway
+        asyncio.run(run_gateway())
+    else:
+        asyncio.run(main(cli_args))
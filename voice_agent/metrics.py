@@ -0,0 +1,310 @@
+import json
+import math
+import time
+from bisect import bisect_left
+from collections import deque
+
+
+class RateCounter:
+    """
+    Monotonic counter that also reports its average rate per second
+    since it was created or last reset.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.started_at = time.monotonic()
+
+    def add(self, amount=1):
+        self.total += amount
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.total / elapsed if elapsed > 0 else 0.0
+
+
+class LatencyStats:
+    """
+    Keeps the most recent latency samples (milliseconds) and summarises them.
+    """
+    def __init__(self, max_samples=1000):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.sum += ms
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))  # Nearest rank
+        return ordered[index]
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50), 1),
+            "p95_ms": round(self.percentile(95), 1),
+            "max_ms": round(max(self.samples), 1),
+        }
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of millisecond values. record() only increments
+    preallocated counters, so it is cheap enough for per-event use.
+    """
+    DEFAULT_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+    def __init__(self, bounds=DEFAULT_BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count, 3),
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class EventStats:
+    """
+    Per-event-type counters with a handler-time histogram for each type.
+    """
+    def __init__(self):
+        self.histograms = {}
+
+    def record(self, event_type, ms):
+        histogram = self.histograms.get(event_type)
+        if histogram is None:
+            histogram = self.histograms[event_type] = Histogram()
+        histogram.record(ms)
+
+    def count(self, event_type):
+        histogram = self.histograms.get(event_type)
+        return histogram.count if histogram else 0
+
+    def summary(self):
+        return {event_type: h.summary() for event_type, h in sorted(self.histograms.items())}
+
+
+# ── Per-turn latency ───────────────────────────
+# Stages of a user turn in the order they normally happen. Every stage is
+# measured in ms from speech_stopped, the end of the user's speech.
+TURN_STAGES = (
+    "speech_stopped",
+    "transcribed",          # Input audio transcription completed
+    "response_done",        # First response.done: the answer, or the function calls
+    "tool_started",         # First tool call of the turn started
+    "tool_finished",        # Last tool call of the turn finished
+    "first_audio_delta",    # First response.audio.delta received
+    "first_sample_played",  # First sample of that audio handed to the output device
+    "playback_finished",    # Last response audio of the turn played out
+)
+
+# A stage is only marked once the stage it depends on has been, so audio that
+# is not the model's (filler clips) does not count as the answer being heard
+_STAGE_REQUIRES = {
+    "first_sample_played": "first_audio_delta",
+    "playback_finished": "first_sample_played",
+}
+
+
+class TurnTimer:
+    """Monotonic timestamps of the stages of one user turn."""
+    def __init__(self, number, speech_stopped_at):
+        self.number = number
+        self.marks = {"speech_stopped": speech_stopped_at}
+        self.pending_tools = 0  # Function calls requested and not yet finished
+        self.awaiting_answer = False  # Function calls were requested; their answer's response.done is not in
+        self.last_audio_at = None  # When the latest response audio was received
+        self.interrupted = False
+        self.finished = False
+
+    def mark(self, stage, at=None, replace=False):
+        """Record `stage` at `at` (now by default). Only the first mark counts unless `replace`."""
+        if self.finished or (stage in self.marks and not replace):
+            return
+        required = _STAGE_REQUIRES.get(stage)
+        if required and required not in self.marks:
+            return
+        self.marks[stage] = time.monotonic() if at is None else at
+
+    def offsets_ms(self):
+        started_at = self.marks["speech_stopped"]
+        return {stage: round((self.marks[stage] - started_at) * 1000, 1)
+                for stage in TURN_STAGES[1:] if stage in self.marks}
+
+
+class TurnLatencyStats:
+    """Per-stage latency percentiles over many turns (of one call, or of every call)."""
+    def __init__(self, max_samples=1000):
+        self.stages = {stage: LatencyStats(max_samples) for stage in TURN_STAGES[1:]}
+        self.turns = 0
+        self.interrupted = 0
+
+    def record(self, turn):
+        self.turns += 1
+        self.interrupted += turn.interrupted
+        for stage, ms in turn.offsets_ms().items():
+            self.stages[stage].record(ms)
+
+    def summary(self):
+        return {
+            "turns": self.turns,
+            "interrupted": self.interrupted,
+            "stages_ms": {stage: stats.summary() for stage, stats in self.stages.items() if stats.count},
+        }
+
+    def prometheus(self, name="voice_turn_stage_ms"):
+        """The stage latencies as a Prometheus text-format summary."""
+        lines = [
+            f"# HELP {name} Milliseconds from the end of user speech to each stage of the turn",
+            f"# TYPE {name} summary",
+        ]
+        for stage, stats in self.stages.items():
+            if not stats.count:
+                continue
+            for quantile in (0.5, 0.9, 0.95, 0.99):
+                lines.append(f'{name}{{stage="{stage}",quantile="{quantile}"}} {stats.percentile(quantile * 100):.1f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats.sum:.1f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats.count}')
+        lines.append("# TYPE voice_turns_total counter")
+        lines.append(f"voice_turns_total {self.turns}")
+        lines.append("# TYPE voice_turns_interrupted_total counter")
+        lines.append(f"voice_turns_interrupted_total {self.interrupted}")
+        return "\n".join(lines) + "\n"
+
+
+class TurnTracker:
+    """
+    Times one call's turns. A turn starts at speech_stopped and finishes once
+    no function call it requested is pending, the response answering them (or
+    the only response) is done and all audio received has played out, or when
+    the user speaks again (interrupted). Finished turns go to `stats`
+    and to every callable in `sinks`.
+    """
+    def __init__(self, sinks=()):
+        self.stats = TurnLatencyStats()
+        self.sinks = list(sinks)
+        self.current = None
+        self._count = 0
+
+    def start(self, at=None):
+        self.finish(interrupted=True)
+        self._count += 1
+        self.current = TurnTimer(self._count, time.monotonic() if at is None else at)
+        return self.current
+
+    def mark(self, stage, at=None, replace=False):
+        if self.current is not None:
+            self.current.mark(stage, at, replace)
+            self._finish_if_complete()
+
+    def audio_received(self):
+        """Response audio arrived: marks first_audio_delta and holds the turn open until it has played."""
+        turn = self.current
+        if turn is not None:
+            turn.mark("first_audio_delta")
+            turn.last_audio_at = time.monotonic()
+
+    def response_done(self, calls=0):
+        """
+        A response finished, requesting `calls` function calls. The turn stays
+        open until each has been passed to tool_finished() and a later response
+        has answered them. Returns the turn to pass to tool_started() and tool_finished().
+        """
+        turn = self.current
+        if turn is None:
+            return None
+        turn.mark("response_done")
+        if not turn.pending_tools:
+            turn.awaiting_answer = False  # A response given while tools ran (a status message) does not count
+        if calls:
+            turn.pending_tools += calls
+            turn.awaiting_answer = True
+        self._finish_if_complete()
+        return turn
+
+    def tool_started(self, turn):
+        if turn is not None:
+            turn.mark("tool_started")
+
+    def tool_finished(self, turn):
+        if turn is not None:
+            turn.pending_tools -= 1
+            turn.mark("tool_finished", replace=True)
+            if turn is self.current:
+                self._finish_if_complete()
+
+    def _finish_if_complete(self):
+        turn = self.current
+        played_at = turn.marks.get("playback_finished")
+        if (played_at is None or "response_done" not in turn.marks
+                or turn.pending_tools or turn.awaiting_answer):
+            return
+        if turn.last_audio_at is None or played_at >= turn.last_audio_at:
+            self.finish()
+
+    def finish(self, interrupted=False):
+        turn, self.current = self.current, None
+        if turn is None:
+            return
+        turn.interrupted = interrupted and "playback_finished" not in turn.marks
+        turn.finished = True
+        self.stats.record(turn)
+        for sink in self.sinks:
+            sink(turn)
+
+
+class TurnLogWriter:
+    """Appends finished turns to a JSON lines file, one object per turn, tagged with `fields`."""
+    def __init__(self, path, **fields):
+        self.path = path
+        self.fields = fields
+
+    def __call__(self, turn):
+        record = {
+            "ts": round(time.time(), 3),
+            **self.fields,
+            "turn": turn.number,
+            "interrupted": turn.interrupted,
+            "stages_ms": turn.offsets_ms(),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
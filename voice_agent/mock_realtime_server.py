@@ -0,0 +1,371 @@
+"""
+Local stand-in for the Azure realtime WebSocket API, for load and latency
+testing without a live deployment.
+
+It speaks the subset of the protocol RealtimeClient uses:
+- client -> server: session.update, input_audio_buffer.append / commit / clear,
+  conversation.item.create, conversation.item.truncate, response.create,
+  response.cancel
+- server -> client: session.created / updated, input_audio_buffer.speech_started /
+  speech_stopped / committed / cleared,
+  conversation.item.input_audio_transcription.completed, conversation.item.created,
+  conversation.item.truncated, response.created, response.output_item.added,
+  response.audio_transcript.delta / done, response.audio.delta / done,
+  response.done (with function_call outputs), error
+
+Turn detection is an RMS energy gate over the appended audio that ends a turn
+after the session's server_vad silence_duration_ms, like the real service,
+and speech during a response cancels it. Responses follow a script, a JSON
+list of turns used in order (and then from the start again):
+
+    [{"say": "Hello, how can I help?"},
+     {"tool_calls": [{"name": "get_time", "arguments": {"city": "London"}}]},
+     {"say": "It is a quarter past ten in London."}]
+
+A tool call turn answers with function calls only; the response.create the
+client sends after posting their outputs plays the next turn.
+
+Timing is configurable: the delay before the first delta, the text token
+rate, how much audio each word produces and the size of each audio delta.
+Audio is a plain tone in the session's output format.
+
+    python mock_realtime_server.py --port 8900 --token-rate 40 --first-delta-ms 300
+    REALTIME_WS_URL=ws://localhost:8900 python main.py --gateway
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import math
+import random
+
+import numpy as np
+import websockets
+
+from audio_codecs import AUDIO_FORMATS, decode_to_pcm16, encode_pcm16
+from logger import logger
+
+DEFAULT_SCRIPT = [
+    {"say": "Hello! Thanks for calling. How can I help you today?"},
+    {"tool_calls": [{"name": "get_time", "arguments": {"city": "London"}}]},
+    {"say": "It is a quarter past ten in the morning in London. Is there anything else I can help with?"},
+]
+
+DEFAULT_SILENCE_DURATION_MS = 500  # Used when session.update sets no server_vad silence_duration_ms
+TONE_HZ = 220
+
+
+class MockRealtimeServer:
+    """
+    Serves mock realtime sessions on ws://host:port. Every connection gets
+    its own session and its own position in the script.
+    """
+    def __init__(self, host="127.0.0.1", port=8900, script=None, first_delta_ms=300.0, jitter_ms=0.0,
+                 token_rate=40.0, ms_per_word=350.0, audio_chunk_ms=100.0, vad_threshold_db=-40.0):
+        self.host = host
+        self.port = port
+        self.script = script or DEFAULT_SCRIPT
+        self.first_delta_ms = first_delta_ms  # Injected latency before a response's first delta
+        self.jitter_ms = jitter_ms  # Uniform random extra latency, 0..jitter_ms
+        self.token_rate = token_rate  # Transcript words generated per second (0 = no pacing)
+        self.ms_per_word = ms_per_word  # Audio produced per word
+        self.audio_chunk_ms = audio_chunk_ms  # Audio per response.audio.delta
+        self.vad_threshold_db = vad_threshold_db
+
+        self.sessions = 0
+        self.active_sessions = 0
+        self.responses = 0
+        self.cancelled_responses = 0
+        self.rejected_responses = 0  # response.create while a response was active
+        self._tones = {}  # (format name, chunk ms) -> base64 tone chunk
+        self._ids = itertools.count(1)
+
+    def new_id(self, prefix):
+        return f"{prefix}_{next(self._ids):06d}"
+
+    def tone_chunk(self, audio_format, chunk_ms):
+        """A base64 tone chunk of `chunk_ms` in `audio_format`, built once and shared by all sessions."""
+        key = (audio_format.name, chunk_ms)
+        if key not in self._tones:
+            t = np.arange(int(audio_format.sample_rate * chunk_ms / 1000)) / audio_format.sample_rate
+            samples = (0.2 * 32767 * np.sin(2 * math.pi * TONE_HZ * t)).astype(np.int16)
+            self._tones[key] = base64.b64encode(encode_pcm16(samples, audio_format.encoding)).decode("ascii")
+        return self._tones[key]
+
+    def response_delay_s(self):
+        return (self.first_delta_ms + random.uniform(0, self.jitter_ms)) / 1000
+
+    def stats(self):
+        return {
+            "sessions": self.sessions,
+            "active_sessions": self.active_sessions,
+            "responses": self.responses,
+            "cancelled_responses": self.cancelled_responses,
+            "rejected_responses": self.rejected_responses,
+        }
+
+    async def _handle(self, ws):
+        self.sessions += 1
+        self.active_sessions += 1
+        session = MockSession(self, ws)
+        try:
+            await session.run()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            session.close()
+            self.active_sessions -= 1
+
+    async def serve_forever(self, ready=None):
+        """Serve sessions until cancelled; `ready` (an asyncio.Event) is set once the port is listening."""
+        async with websockets.serve(self._handle, self.host, self.port, max_size=None):
+            logger.info(f"🧪 Mock realtime server listening on ws://{self.host}:{self.port}")
+            if ready:
+                ready.set()
+            await asyncio.Future()
+
+
+class MockSession:
+    """One mock realtime session: its settings, input audio buffer, turn detection and responses."""
+    def __init__(self, server, ws):
+        self.server = server
+        self.ws = ws
+        self.session = {
+            "id": server.new_id("sess"),
+            "modalities": ["audio", "text"],
+            "input_audio_format": "pcm16",
+            "output_audio_format": "pcm16",
+            "turn_detection": {"type": "server_vad", "silence_duration_ms": DEFAULT_SILENCE_DURATION_MS},
+        }
+        self._turns = itertools.cycle(server.script)
+
+        self._buffer_ms = 0.0  # Audio appended since the buffer was last committed or cleared
+        self._stream_ms = 0.0  # Audio appended over the whole session, for audio_start_ms / audio_end_ms
+        self._speech_ms = 0.0
+        self._silence_ms = 0.0
+        self._in_speech = False
+
+        self._response_task = None
+        self._response = None  # Response in progress: {"id", "status", "output"}
+
+    @property
+    def input_format(self):
+        return AUDIO_FORMATS[self.session["input_audio_format"]]
+
+    @property
+    def output_format(self):
+        return AUDIO_FORMATS[self.session["output_audio_format"]]
+
+    async def send(self, event):
+        event.setdefault("event_id", self.server.new_id("event"))
+        await self.ws.send(json.dumps(event))
+
+    async def run(self):
+        await self.send({"type": "session.created", "session": self.session})
+        async for message in self.ws:
+            event = json.loads(message)
+            handler = getattr(self, "_on_" + event.get("type", "").replace(".", "_"), None)
+            if handler is None:
+                await self.send({"type": "error", "error": {
+                    "type": "invalid_request_error", "message": f"Unsupported event type: {event.get('type')}"
+                }})
+                continue
+            await handler(event)
+
+    def close(self):
+        if self._response_task:
+            self._response_task.cancel()
+
+    # ── Session ──
+    async def _on_session_update(self, event):
+        self.session.update(event.get("session", {}))
+        await self.send({"type": "session.updated", "session": self.session})
+
+    # ── Input audio and turn detection ──
+    async def _on_input_audio_buffer_append(self, event):
+        audio = base64.b64decode(event["audio"])
+        chunk_ms = len(audio) / self.input_format.bytes_per_ms
+        self._buffer_ms += chunk_ms
+        self._stream_ms += chunk_ms
+
+        turn_detection = self.session.get("turn_detection")
+        if not turn_detection:
+            return
+        samples = decode_to_pcm16(audio, self.input_format.encoding).astype(np.float32)
+        rms = math.sqrt(float(np.dot(samples, samples)) / samples.size) if samples.size else 0.0
+        is_speech = rms > 0 and 20 * math.log10(rms / 32768.0) >= self.server.vad_threshold_db
+
+        if is_speech:
+            self._silence_ms = 0.0
+            self._speech_ms += chunk_ms
+            if not self._in_speech:
+                self._in_speech = True
+                await self.send({"type": "input_audio_buffer.speech_started",
+                                 "audio_start_ms": int(self._stream_ms - chunk_ms)})
+                await self._cancel_response()
+        elif self._in_speech:
+            self._silence_ms += chunk_ms
+            if self._silence_ms >= turn_detection.get("silence_duration_ms", DEFAULT_SILENCE_DURATION_MS):
+                self._in_speech = False
+                await self.send({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": int(self._stream_ms)})
+                await self._commit()
+                self._start_response()
+
+    async def _on_input_audio_buffer_commit(self, event):
+        await self._commit()
+
+    async def _on_input_audio_buffer_clear(self, event):
+        self._buffer_ms = 0.0
+        await self.send({"type": "input_audio_buffer.cleared"})
+
+    async def _commit(self):
+        item_id = self.server.new_id("item")
+        await self.send({"type": "input_audio_buffer.committed", "item_id": item_id})
+        await self.send({
+            "type": "conversation.item.input_audio_transcription.completed",
+            "item_id": item_id,
+            "content_index": 0,
+            "transcript": f"[{self._speech_ms / 1000:.1f} s of caller speech]",
+        })
+        self._buffer_ms = 0.0
+        self._speech_ms = 0.0
+
+    # ── Conversation ──
+    async def _on_conversation_item_create(self, event):
+        item = {"id": self.server.new_id("item"), **event.get("item", {})}
+        await self.send({"type": "conversation.item.created", "item": item})
+
+    async def _on_conversation_item_truncate(self, event):
+        await self.send({
+            "type": "conversation.item.truncated",
+            "item_id": event.get("item_id"),
+            "content_index": event.get("content_index", 0),
+            "audio_end_ms": event.get("audio_end_ms", 0),
+        })
+
+    # ── Responses ──
+    async def _on_response_create(self, event):
+        if not self._start_response():
+            self.server.rejected_responses += 1
+            await self.send({"type": "error", "error": {
+                "type": "invalid_request_error",
+                "code": "conversation_already_has_active_response",
+                "message": f"Conversation already has an active response in progress: {self._response['id']}. "
+                           "Wait until the response is finished before creating a new one.",
+                "event_id": event.get("event_id"),
+            }})
+
+    async def _on_response_cancel(self, event):
+        await self._cancel_response()
+
+    def _start_response(self):
+        """Start the next scripted response; False if one is already active (one at a time, like the real service)."""
+        if self._response_task and not self._response_task.done():
+            return False
+        self._response = {"id": self.server.new_id("resp"), "status": "in_progress", "output": []}
+        self._response_task = asyncio.create_task(self._respond(self._response, next(self._turns)))
+        return True
+
+    async def _cancel_response(self):
+        task, response = self._response_task, self._response
+        if task is None or task.done():
+            return
+        task.cancel()
+        await asyncio.wait({task})
+        self.server.cancelled_responses += 1
+        response["status"] = "cancelled"
+        await self.send({"type": "response.done", "response": response})
+
+    async def _respond(self, response, turn):
+        server = self.server
+        server.responses += 1
+        await self.send({"type": "response.created", "response": {**response, "output": []}})
+        await asyncio.sleep(server.response_delay_s())
+
+        if "tool_calls" in turn:
+            for call in turn["tool_calls"]:
+                response["output"].append({
+                    "id": server.new_id("item"),
+                    "type": "function_call",
+                    "status": "completed",
+                    "call_id": server.new_id("call"),
+                    "name": call["name"],
+                    "arguments": json.dumps(call.get("arguments", {})),
+                })
+        else:
+            await self._speak(response, turn.get("say", ""))
+
+        response["status"] = "completed"
+        await self.send({"type": "response.done", "response": response})
+
+    async def _speak(self, response, text):
+        """Stream `text` as transcript deltas at the token rate, with audio deltas of audio_chunk_ms as it accrues."""
+        server = self.server
+        item_id = server.new_id("item")
+        item = {"id": item_id, "type": "message", "role": "assistant", "status": "in_progress",
+                "content": [{"type": "audio", "transcript": ""}]}
+        response["output"].append(item)
+        await self.send({"type": "response.output_item.added", "response_id": response["id"], "output_index": 0, "item": item})
+
+        ids = {"response_id": response["id"], "item_id": item_id, "output_index": 0, "content_index": 0}
+        tone = server.tone_chunk(self.output_format, server.audio_chunk_ms)
+        pending_ms = 0.0
+        for word in text.split():
+            if server.token_rate > 0:
+                await asyncio.sleep(1 / server.token_rate)
+            delta = word if not item["content"][0]["transcript"] else " " + word
+            item["content"][0]["transcript"] += delta
+            await self.send({"type": "response.audio_transcript.delta", **ids, "delta": delta})
+            pending_ms += server.ms_per_word
+            while pending_ms >= server.audio_chunk_ms:
+                pending_ms -= server.audio_chunk_ms
+                await self.send({"type": "response.audio.delta", **ids, "delta": tone})
+        if pending_ms > 0:
+            await self.send({"type": "response.audio.delta", **ids, "delta": tone})
+
+        item["status"] = "completed"
+        await self.send({"type": "response.audio.done", **ids})
+        await self.send({"type": "response.audio_transcript.done", **ids, "transcript": item["content"][0]["transcript"]})
+
+
+def load_script(path):
+    with open(path, encoding="utf-8") as f:
+        script = json.load(f)
+    if not isinstance(script, list) or not all("say" in turn or "tool_calls" in turn for turn in script):
+        raise ValueError(f"{path}: expected a list of {{\"say\": ...}} or {{\"tool_calls\": [...]}} turns")
+    return script
+
+
+def add_server_arguments(parser):
+    """Mock server options, shared with load_test.py."""
+    parser.add_argument("--script", help="JSON file with the response script (default: greeting, get_time call, answer)")
+    parser.add_argument("--first-delta-ms", type=float, default=300.0, help="Latency before a response's first delta")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency per response, 0..N ms")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="Transcript words per second (0 = unpaced)")
+    parser.add_argument("--ms-per-word", type=float, default=350.0, help="Response audio per word")
+    parser.add_argument("--audio-chunk-ms", type=float, default=100.0, help="Audio per response.audio.delta")
+    parser.add_argument("--vad-threshold-db", type=float, default=-40.0, help="Speech energy threshold in dBFS")
+
+
+def server_from_arguments(cli_args, host, port):
+    return MockRealtimeServer(
+        host=host,
+        port=port,
+        script=load_script(cli_args.script) if cli_args.script else None,
+        first_delta_ms=cli_args.first_delta_ms,
+        jitter_ms=cli_args.jitter_ms,
+        token_rate=cli_args.token_rate,
+        ms_per_word=cli_args.ms_per_word,
+        audio_chunk_ms=cli_args.audio_chunk_ms,
+        vad_threshold_db=cli_args.vad_threshold_db,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Azure realtime WebSocket server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_server_arguments(parser)
+    cli_args = parser.parse_args()
+    asyncio.run(server_from_arguments(cli_args, cli_args.host, cli_args.port).serve_forever())
@@ -1,9 +1,48 @@
-import json, ssl, base64, asyncio, websockets, logging
-from config import AZURE_WS_URL, AZURE_RTOPENAI_KEY
-from tools import FUNCTION_SCHEMAS, TOOLS
+import json, ssl, base64, asyncio, websockets, logging, time, random
+from collections import deque
+from config import (
+    AZURE_WS_URL,
+    AZURE_RTOPENAI_KEY,
+    CAPTURE_QUEUE_MAX_FRAMES,
+    UPLINK_BATCH_MS,
+    UPLINK_MAX_LATENCY_MS,
+    LOCAL_VAD_ENABLED,
+    LOCAL_VAD_THRESHOLD_DB,
+    RECONNECT_BUDGET_S,
+    RECONNECT_INITIAL_BACKOFF_S,
+    RECONNECT_MAX_BACKOFF_S,
+    RESUME_MAX_TURNS,
+    RESUME_MAX_CHARS,
+    FILLER_AUDIO_ENABLED,
+    FILLER_GAP_S,
+    TURN_METRICS_PATH,
+    SESSION_RECORD_DIR,
+)
+from tools import FUNCTION_SCHEMAS
 from audio_handler import AudioHandler
+from uplink import UplinkBatcher
+from tool_runner import ToolRunner, BackendQueryRegistry
+from filler_audio import FillerAudioCache, detect_language
+from audio_codecs import AUDIO_FORMATS, Transcoder
+from vad import VoiceActivityGate
+from metrics import LatencyStats, EventStats, TurnTracker, TurnLogWriter
+from session_recorder import SessionRecorder, SENT, RECEIVED
 import os
-from logger import logger
+from logger import LIFECYCLE, logger
+
+# Log one in this many audio delta events at DEBUG level
+AUDIO_DELTA_LOG_EVERY = 200
+
+# Tools that keep running while the conversation goes on; barge-in does not cancel them
+BACKGROUND_TOOLS = {"query_chatbot_backend"}
+
+# Server-side turn detection used by every session
+SERVER_VAD_CONFIG = {
+    "type": "server_vad",
+    "threshold": 0.9,  # Increased from 0.5 to 0.8 - requires louder speech to activate
+    "prefix_padding_ms": 300,
+    "silence_duration_ms": 1000  # Increased from 600 to 800ms - requires longer silence to stop
+}
 
 # ── Optional: Keyboard help text ─────────────────────────
 KEYBOARD_COMMANDS = """
@@ -12,195 +51,600 @@ t: Send text message
 a: Send audio message
 """
 
+def build_session_config(instructions, voice="verse", turn_detection=SERVER_VAD_CONFIG, audio_format="pcm16"):
+    """
+    Return the session.update payload shared by direct and pooled sessions.
+    `audio_format` is the realtime wire format for both directions
+    (pcm16, g711_ulaw or g711_alaw).
+    """
+    return {
+        "modalities": ["audio", "text"],
+        "instructions": instructions,
+        "voice": voice,
+        "input_audio_format": audio_format,
+        "output_audio_format": audio_format,
+        "turn_detection": turn_detection,
+        "input_audio_transcription": {
+            "model": "whisper-1"
+        },
+        "temperature": 0.6,
+        "tools": FUNCTION_SCHEMAS,
+        "tool_choice": "auto"
+    }
+
+
+def realtime_ssl_context():
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+
+async def open_realtime_session(session_config, url=AZURE_WS_URL, api_key=AZURE_RTOPENAI_KEY, ssl_context=None):
+    """Open a realtime WebSocket and apply `session_config` to it."""
+    headers = {
+        "api-key": api_key,
+        "OpenAI-Beta": "realtime=v1"
+    }
+    ws = await websockets.connect(
+        url,
+        additional_headers=headers,
+        ssl=(ssl_context or realtime_ssl_context()) if url.startswith("wss://") else None
+    )
+    await ws.send(json.dumps({
+        "type": "session.update",
+        "session": session_config
+    }))
+    return ws
+
+
 class RealtimeClient:
-    def __init__(self, instructions, voice="verse"):
+    def __init__(self, instructions, voice="verse", audio_handler=None, session_id=None, tool_executor=None,
+                 fillers=None, audio_format="pcm16", turn_sinks=()):
+        """
+        `audio_handler` defaults to a local PyAudio AudioHandler; the gateway passes a
+        per-call bridge instead. `session_id` is the backend chatbot session for this
+        call (the process-wide session when None). Synchronous tools run on
+        `tool_executor` (a private bounded pool when None). `fillers` is a shared
+        FillerAudioCache (loaded here when None and FILLER_AUDIO_ENABLED).
+        `audio_format` is the realtime wire format; `audio_handler` must consume
+        and produce audio in it. Every finished turn is also passed to each
+        callable in `turn_sinks` (see metrics.TurnTracker).
+        """
         # WebSocket Configuration
-        resource = os.getenv('AZURE_RTOPENAI_RESOURCE')
         deployment = os.getenv('AZURE_RTOPENAI_DEPLOYMENT')
-        api_version = os.getenv('AZURE_RTOPENAI_API_VERSION')
 
-        self.url = f"wss://{resource}/openai/realtime?deployment={deployment}&api-version={api_version}"
+        self.url = AZURE_WS_URL
         self.model = deployment
         self.api_key = os.getenv('AZURE_RTOPENAI_KEY')
 
         self.ws = None
-        self.audio_handler = AudioHandler()
+        self._early_messages = []  # Received by a pooled session before this call took it
+        self.audio_handler = audio_handler or AudioHandler()
+        self.session_id = session_id
+        self.tool_runner = ToolRunner(tool_executor)
+        self.backend_queries = BackendQueryRegistry()
+        if fillers is None and FILLER_AUDIO_ENABLED:
+            fillers = FillerAudioCache()
+        self.fillers = fillers
+        self._filler_task = None
+        self._backend_waiting = 0  # Backend queries the caller is waiting on
+        self._fillers_held = False  # Barged in on; no fillers until those backend queries are done
+        self.audio_format = AUDIO_FORMATS[audio_format]
+        # Filler clips are stored as 24 kHz pcm16
+        self._filler_transcoder = Transcoder(AUDIO_FORMATS["pcm16"], self.audio_format)
+        self._tool_tasks = set()  # Tasks running a tool call and posting its output
+        self.tool_calls = 0
+
+        # Reconnect / resume state
+        self._closing = False
+        self._transcript = deque(maxlen=RESUME_MAX_TURNS)  # (speaker, text) per finished turn
+        self._undelivered_outputs = []  # (call_id, name, arguments, output) held while disconnected
+        self._held_events = []  # Other events sent while disconnected, sent once the session is resumed
+        self._reconnecting = False
+        self.reconnects = 0
+
+        self.uplink = UplinkBatcher(
+            self._send_audio_append,
+            bytes_per_ms=self.audio_handler.bytes_per_ms,
+            batch_ms=UPLINK_BATCH_MS,
+            max_latency_ms=UPLINK_MAX_LATENCY_MS,
+        )
+
+        # speech_started -> output silenced, per barge-in
+        self.barge_in_latency = LatencyStats()
+        # Per-event-type counts and handler times
+        self.event_stats = EventStats()
+        # Per-turn stage latencies, from the end of the user's speech to the end of playout
+        turn_sinks = list(turn_sinks)
+        if TURN_METRICS_PATH:
+            turn_sinks.append(TurnLogWriter(TURN_METRICS_PATH, session_id=session_id))
+        self.turns = TurnTracker(turn_sinks)
+        self._loop = None
+        self.audio_handler.on_playback = self._on_playback
+        # Every event sent and received, for replay_session.py
+        self.recorder = SessionRecorder.for_call(SESSION_RECORD_DIR, session_id) if SESSION_RECORD_DIR else None
+
+        # Server event type -> coroutine handling it. response.audio.delta is
+        # handled inline in handle_event and is not part of this table.
+        self._event_handlers = {
+            "error": self._on_error,
+            "conversation.item.input_audio_transcription.completed": self._on_transcription_completed,
+            "conversation.item.input_audio_transcription.failed": self._on_transcription_failed,
+            "response.text.delta": self._on_text_delta,
+            "response.text.done": self._on_text_done,
+            "response.audio_transcript.done": self._on_audio_transcript_done,
+            "response.audio.done": self._on_audio_done,
+            "response.done": self._on_response_done,
+            "input_audio_buffer.speech_started": self._on_speech_started,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "conversation.item.created": self._on_item_created,
+            "conversation.item.truncated": self._on_item_truncated,
+        }
 
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.ssl_context = realtime_ssl_context()
         
         self.instructions = instructions
         self.voice = voice
 
         self.VAD_turn_detection = True
-        self.VAD_config = {
-            "type": "server_vad",
-            "threshold": 0.9,  # Increased from 0.5 to 0.8 - requires louder speech to activate
-            "prefix_padding_ms": 300,
-            "silence_duration_ms": 1000  # Increased from 600 to 800ms - requires longer silence to stop
-        }
-
-        self.session_config = {
-            "modalities": ["audio", "text"],
-            "instructions": self.instructions,
-            "voice": self.voice,
-            "input_audio_format": "pcm16",
-            "output_audio_format": "pcm16",
-            "turn_detection": self.VAD_config if self.VAD_turn_detection else None,
-            "input_audio_transcription": {
-                "model": "whisper-1"
-            },
-            "temperature": 0.6,
-            "tools": FUNCTION_SCHEMAS,
-            "tool_choice": "auto"
-        }
+        self.VAD_config = dict(SERVER_VAD_CONFIG)
 
-    async def connect(self):
-        logger.info(f"Connecting to WebSocket: {self.url}")
-        headers = {
-            "api-key": self.api_key,
-            "OpenAI-Beta": "realtime=v1"
-        }
-
-        self.ws = await websockets.connect(
-            self.url,
-            extra_headers=headers,
-            ssl=self.ssl_context
+        self.session_config = build_session_config(
+            self.instructions,
+            self.voice,
+            self.VAD_config if self.VAD_turn_detection else None,
+            audio_format,
         )
-        logger.info("Successfully connected to OpenAI Realtime API")
 
-        await self.send_event({
-            "type": "session.update",
-            "session": self.session_config
-        })
+        # Optional local gate that holds back silence before it is encoded and uploaded.
+        # Pre-roll and hangover mirror the server VAD padding so turn detection is unchanged.
+        self.vad = None
+        if LOCAL_VAD_ENABLED and audio_format == "pcm16":
+            self.vad = VoiceActivityGate(
+                sample_rate=self.audio_handler.rate,
+                energy_threshold_db=LOCAL_VAD_THRESHOLD_DB,
+                preroll_ms=self.VAD_config["prefix_padding_ms"],
+                hangover_ms=self.VAD_config["silence_duration_ms"] + 200,
+            )
+
+    async def connect(self, pooled_session=None):
+        """
+        Connect and configure the realtime session, then ask for the greeting.
+        A `pooled_session` from RealtimeSessionPool skips the handshake and
+        session.update; if it already generated the greeting, that is replayed.
+        """
+        if pooled_session is not None:
+            self.attach(pooled_session.ws)
+            self._early_messages = pooled_session.early_messages
+            logger.info(f"Using pre-warmed realtime session (age {pooled_session.age():.0f}s)",
+                        extra=LIFECYCLE)
+            if not pooled_session.greeting_requested:
+                await self.send_event({"type": "response.create"})
+            return
+
+        logger.info(f"Connecting to WebSocket: {self.url}", extra=LIFECYCLE)
+        self.attach(await open_realtime_session(self.session_config, self.url, self.api_key, self.ssl_context))
+        if self.recorder:
+            self.recorder.record(SENT, {"type": "session.update", "session": self.session_config})
+        logger.info("Successfully connected to OpenAI Realtime API", extra=LIFECYCLE)
 
         await self.send_event({"type": "response.create"})
 
-    async def send_event(self, event):
-        await self.ws.send(json.dumps(event))
-        logger.debug(f"Event sent - type: {event['type']}")
+    def attach(self, ws):
+        """Use `ws` as the realtime socket: an open session, or a stand-in such as replay_session's."""
+        self.ws = ws
+        self._loop = asyncio.get_running_loop()
 
-    async def receive_events(self):
+    async def send_event(self, event, hold=True, ws=None):
+        """
+        Send `event` on the realtime socket (or on `ws`). While the session is
+        down the event is held and sent once it has been resumed; with
+        `hold=False` ConnectionClosed is raised instead, for callers that hold
+        or drop what they send themselves.
+        """
+        if ws is None:
+            if hold and self._reconnecting:
+                self._held_events.append(event)
+                return
+            ws = self.ws
         try:
-            async for message in self.ws:
-                event = json.loads(message)
-                await self.handle_event(event)
+            await ws.send(json.dumps(event))
         except websockets.ConnectionClosed as e:
-            logger.error(f"WebSocket connection closed: {e}")
-        except Exception as e:
-            logger.error(f"An unexpected error occurred: {e}")
+            if not hold or self._closing or ws is not self.ws or isinstance(e, websockets.ConnectionClosedOK):
+                raise  # A clean close ends the session; there is nothing to resume
+            self._held_events.append(event)  # The receive loop is about to notice and reconnect
+            return
+        if self.recorder:
+            self.recorder.record(SENT, event)
+        logger.debug("Event sent - type: %s", event["type"])
+
+    async def receive_events(self):
+        """
+        Handle server events until the call ends. If the socket drops, reconnect
+        with backoff and resume the conversation instead of ending the call.
+        """
+        while True:
+            try:
+                # Replay anything a pooled session received before it was handed out
+                early_messages, self._early_messages = self._early_messages, []
+                for message in early_messages:
+                    await self._receive(message)
+
+                async for message in self.ws:
+                    await self._receive(message)
+                logger.info("Realtime session closed normally")
+                return  # The iteration ends without an exception on a clean close
+            except websockets.ConnectionClosedOK:
+                logger.info("Realtime session closed normally")
+                return
+            except websockets.ConnectionClosed as e:
+                logger.error(f"WebSocket connection closed: {e}")
+            except Exception as e:
+                logger.error(f"An unexpected error occurred: {e}")
+                return
+
+            if self._closing:
+                return
+            self._reconnecting = True
+            try:
+                if not await self._reconnect():
+                    return
+            finally:
+                self._reconnecting = False
+
+    async def _receive(self, message):
+        event = json.loads(message)
+        if self.recorder:
+            self.recorder.record(RECEIVED, event)
+        await self.handle_event(event)
+
+    async def _reconnect(self):
+        """Re-open the session with jittered exponential backoff within RECONNECT_BUDGET_S."""
+        # Whatever audio already arrived is all this response will get
+        self.audio_handler.mark_audio_response_complete()
+
+        deadline = time.monotonic() + RECONNECT_BUDGET_S
+        delay = RECONNECT_INITIAL_BACKOFF_S
+        attempt = 0
+        while not self._closing and time.monotonic() < deadline:
+            attempt += 1
+            await asyncio.sleep(min(delay * random.uniform(0.5, 1.0), max(deadline - time.monotonic(), 0)))
+            ws = None
+            try:
+                ws = await open_realtime_session(self.session_config, self.url, self.api_key, self.ssl_context)
+                await self._resume_conversation(ws)
+            except asyncio.CancelledError:
+                if ws is not None:
+                    await ws.close()
+                raise
+            except Exception as e:
+                logger.warning(f"🔌 Reconnect attempt {attempt} failed: {e}")
+                if ws is not None:
+                    await ws.close()
+                delay = min(delay * 2, RECONNECT_MAX_BACKOFF_S)
+                continue
+
+            # Only now, with the summary and held calls in place, does everything else use the new socket
+            self.ws = ws
+            self.reconnects += 1
+            logger.info(f"🔌 Reconnected after {attempt} attempt(s)", extra=LIFECYCLE)
+            return True
+
+        logger.error(f"🔌 Giving up on reconnect after {attempt} attempt(s)")
+        return False
+
+    def _conversation_summary(self):
+        """The most recent turns as 'Speaker: text' lines, newest kept within RESUME_MAX_CHARS."""
+        lines = []
+        used = 0
+        for speaker, text in reversed(self._transcript):
+            line = f"{speaker}: {text}"
+            if used + len(line) > RESUME_MAX_CHARS:
+                break
+            lines.append(line)
+            used += len(line) + 1
+        return "\n".join(reversed(lines))
+
+    async def _resume_conversation(self, ws):
+        """
+        Seed the fresh session on `ws` with the conversation so far, then send
+        the tool results and other events held during the outage, including
+        any held while this runs, with one response.create if any asked for it.
+        """
+        summary = self._conversation_summary()
+        if summary:
+            await self.send_event({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "system",
+                    "content": [{
+                        "type": "input_text",
+                        "text": "The connection was briefly interrupted. Continue this conversation "
+                                "without greeting the user again. Conversation so far:\n" + summary
+                    }]
+                }
+            }, ws=ws)
+
+        outputs_sent = events_sent = 0
+        respond = False
+        while True:
+            for call_id, name, arguments, output in self._undelivered_outputs[outputs_sent:]:
+                logger.info(f"📦 Re-delivering {name} result held during the outage")
+                # The new session has never seen this call, so recreate it before its output
+                await self.send_event({
+                    "type": "conversation.item.create",
+                    "item": {"type": "function_call", "call_id": call_id, "name": name, "arguments": arguments}
+                }, ws=ws)
+                await self.send_event({
+                    "type": "conversation.item.create",
+                    "item": {"type": "function_call_output", "call_id": call_id, "output": output}
+                }, ws=ws)
+                outputs_sent += 1
+                respond = True
+            for event in self._held_events[events_sent:]:
+                if event["type"] == "response.create":
+                    respond = True  # Sent once, after everything else
+                else:
+                    await self.send_event(event, ws=ws)
+                events_sent += 1
+            if respond:
+                await self.send_event({"type": "response.create"}, ws=ws)
+                respond = False
+            elif outputs_sent == len(self._undelivered_outputs) and events_sent == len(self._held_events):
+                break  # Nothing was added while sending
+        # Only forget the held results once the new session has them all
+        del self._undelivered_outputs[:outputs_sent]
+        del self._held_events[:events_sent]
+
+    async def _send_tool_output(self, call_id, name, arguments, result, respond=True):
+        """
+        Post a tool result and, with `respond`, ask the model to respond. If the
+        socket is down, the result is held and re-delivered once the session is resumed.
+        """
+        if self._closing:
+            return
+        output = json.dumps(result)
+        try:
+            await self.send_event({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "function_call_output",
+                    "call_id": call_id,
+                    "output": output
+                }
+            }, hold=False)
+            if respond:
+                await self.send_event({"type": "response.create"}, hold=False)
+        except websockets.ConnectionClosed:
+            logger.warning(f"📦 Connection down - holding {name} result for re-delivery")
+            self._undelivered_outputs.append((call_id, name, arguments, output))
+
+    def register_handler(self, event_type, handler):
+        """Register (or replace) the coroutine that handles a server event type."""
+        self._event_handlers[event_type] = handler
 
     async def handle_event(self, event):
         event_type = event.get("type")
-        logger.debug(f"Received event type: {event_type}")
+        started = time.perf_counter()
 
-        if event_type == "error":
-            logger.error(f"Error event received: {event['error']['message']}")
-
-        # ── User Input Transcription Events ──
-        elif event_type == "conversation.item.input_audio_transcription.completed":
-            user_transcript = event.get("transcript", "")
-            logger.info(f"🎤 USER INPUT TRANSCRIPTION: '{user_transcript}'")
-
-        elif event_type == "conversation.item.input_audio_transcription.failed":
-            logger.warning(f"⚠️  USER TRANSCRIPTION FAILED: {event.get('error', 'Unknown error')}")
-
-        # ── Agent Output Text Events ──
-        elif event_type == "response.text.delta":
-            print(event["delta"], end="", flush=True)
-
-        elif event_type == "response.text.done":
-            agent_text = event.get("text", "")
-            if agent_text:
-                logger.info(f"🤖 AGENT SPEECH TRANSCRIPT: '{agent_text}'")
-                print(f"\n🤖 Agent text: {agent_text}")
-
-        # ── Agent Audio Events ──
-        elif event_type == "response.audio.delta":
-            audio_data = base64.b64decode(event["delta"])
+        # ── Fast path: audio deltas arrive many times per second ──
+        if event_type == "response.audio.delta":
             # Stream audio immediately instead of buffering
-            self.audio_handler.add_streaming_audio(audio_data)
-            logger.debug(f"🔊 Streaming audio chunk: {len(audio_data)} bytes")
-
-        elif event_type == "response.audio.done":
-            # Mark that no more audio chunks will come
-            self.audio_handler.mark_audio_response_complete()
-            logger.info("🔊 Audio response complete - letting remaining chunks finish playing")
-
-        elif event_type == "response.done":
-            outputs = event["response"]["output"]
-
-            if outputs and outputs[0]["type"] == "function_call":
-                # ✅ Tool handling for all tools
-                fc = outputs[0]
-                name = fc["name"]
-                call_id = fc["call_id"]
-                args = json.loads(fc["arguments"])
-
-                logger.info(f"Function call requested: {name} with args {args}")
-                
-                # Special handling for backend tool - make it non-blocking
-                if name in ["query_chatbot_backend"]:
-                    logger.info(f"🔄 Backend tool detected - sending status and running async")
-                    
-                    # Send immediate status message
-                    await self.send_event({
-                        "type": "conversation.item.create",
-                        "item": {
-                            "type": "message",
-                            "role": "assistant",
-                            "content": [{"type": "text", "text": "**talk natually like using normal humans words such as hmm sure or something like that"
-                            "tell the user that we you have understood the request and are processing it ,"
-                            " it might take some time , "
-                            "please wait"
-                            "**TALK IN GAP , KEEP TALKING UNTIL THE BACKEND TOOL IS DONE**"}]
-                        }
-                    })
-                    await self.send_event({"type": "response.create"})
-                    
-                    # Run backend tool in background without blocking
-                    asyncio.create_task(self._execute_backend_tool_async(call_id, args))
-                    return  # Exit early, don't block on tool execution
-                
-                try:
-                    # Handle other tools normally (synchronously)
-                    result = TOOLS[name](**args)
-                except Exception as e:
-                    result = {"error": str(e)}
-                    logger.exception(f"Tool {name} failed")
+            self.audio_handler.add_streaming_audio(
+                base64.b64decode(event["delta"]), event.get("item_id"), event.get("content_index", 0)
+            )
+            self.turns.audio_received()
+            self.event_stats.record(event_type, (time.perf_counter() - started) * 1000)
+            if self.event_stats.count(event_type) % AUDIO_DELTA_LOG_EVERY == 1 and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔊 Streaming audio chunk #%d", self.event_stats.count(event_type))
+            return
+
+        logger.debug("Received event type: %s", event_type)
+        handler = self._event_handlers.get(event_type)
+        if handler is not None:
+            await handler(event)
+        self.event_stats.record(event_type, (time.perf_counter() - started) * 1000)
+
+    async def _on_error(self, event):
+        logger.error(f"Error event received: {event['error']['message']}")
+
+    # ── User Input Transcription Events ──
+    async def _on_transcription_completed(self, event):
+        user_transcript = event.get("transcript", "")
+        self.turns.mark("transcribed")
+        logger.info(f"🎤 USER INPUT TRANSCRIPTION: '{user_transcript}'")
+        if user_transcript.strip():
+            self._transcript.append(("User", user_transcript.strip()))
+
+    async def _on_transcription_failed(self, event):
+        logger.warning(f"⚠️  USER TRANSCRIPTION FAILED: {event.get('error', 'Unknown error')}")
+
+    # ── Agent Output Text Events ──
+    async def _on_text_delta(self, event):
+        print(event["delta"], end="", flush=True)
+
+    async def _on_text_done(self, event):
+        agent_text = event.get("text", "")
+        if agent_text:
+            logger.info(f"🤖 AGENT SPEECH TRANSCRIPT: '{agent_text}'")
+            print(f"\n🤖 Agent text: {agent_text}")
+            self._transcript.append(("Assistant", agent_text))
+
+    async def _on_audio_transcript_done(self, event):
+        agent_transcript = event.get("transcript", "")
+        if agent_transcript:
+            logger.info(f"🤖 AGENT AUDIO TRANSCRIPT: '{agent_transcript}'")
+            self._transcript.append(("Assistant", agent_transcript))
+
+    # ── Agent Audio Events ──
+    async def _on_audio_done(self, event):
+        # Mark that no more audio chunks will come
+        self.audio_handler.mark_audio_response_complete()
+        logger.info("🔊 Audio response complete - letting remaining chunks finish playing")
+
+    async def _on_response_done(self, event):
+        outputs = event["response"]["output"]
+        calls = [item for item in outputs if item["type"] == "function_call"]
+        timer = self.turns.response_done(len(calls))
+        if not calls:
+            return
+
+        self.tool_calls += len(calls)
+        for fc in calls:
+            logger.info(f"Function call requested: {fc['name']} with args {fc['arguments']}")
+        background = [fc for fc in calls if fc["name"] in BACKGROUND_TOOLS]
+        foreground = [fc for fc in calls if fc["name"] not in BACKGROUND_TOOLS]
+
+        # Special handling for backend tool - make it non-blocking
+        if background and not foreground and self._start_fillers():
+            logger.info(f"🔄 Backend tool detected - playing filler audio and running async")
+        elif background and not foreground:
+            logger.info(f"🔄 Backend tool detected - sending status and running async")
+
+            # Send immediate status message
+            await self.send_event({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "text", "text": (
+                        "Briefly and naturally tell the caller that you have understood their request "
+                        "and are looking into it, and that it may take a few moments. "
+                        "Do not answer the question yet."
+                    )}]
+                }
+            })
+            await self.send_event({"type": "response.create"})
+
+        # Keep handling events (and barge-ins) while the tools run
+        self._start_tool_task(self._run_tool_calls(calls, event["response"].get("id"), timer))
+
+    def _start_tool_task(self, coro):
+        task = asyncio.create_task(coro)
+        self._tool_tasks.add(task)
+        task.add_done_callback(self._tool_tasks.discard)
+        return task
+
+    async def _run_tool_calls(self, calls, turn=None, timer=None):
+        """
+        Run the function calls of one response concurrently, backend queries
+        included. Each output is posted as soon as its tool finishes; a single
+        response.create follows once all of them are in, unless every call was
+        cancelled by a barge-in. `turn` is the id of the response that asked,
+        `timer` its TurnTracker turn.
+        """
+        try:
+            cancelled = await asyncio.gather(*(self._run_tool_call(fc, turn, timer) for fc in calls))
+        finally:
+            if not self._backend_waiting:
+                self._stop_fillers()  # Started for backend calls that never got to run
+        if all(cancelled) or self._closing:
+            return
+        try:
+            await self.send_event({"type": "response.create"}, hold=False)
+        except websockets.ConnectionClosed:
+            pass  # Held outputs are re-delivered with their own response.create on resume
 
+    async def _run_tool_call(self, fc, turn=None, timer=None):
+        """Run one function call and post its output. Returns whether it was cancelled."""
+        name = fc["name"]
+        try:
+            args = json.loads(fc["arguments"])
+        except json.JSONDecodeError as e:
+            self.turns.tool_finished(timer)  # Never runs, but response_done() counted it
+            result = {"error": f"Invalid arguments for {name}: {e}"}
+        else:
+            if name in BACKGROUND_TOOLS:
+                return await self._execute_backend_tool_async(fc["call_id"], args, fc["arguments"], turn, timer)
+            self.turns.tool_started(timer)
+            try:
+                result = await self.tool_runner.run(name, args)
+            finally:
+                self.turns.tool_finished(timer)
+        # A tool abandoned on barge-in still gets its output, but the model should listen, not answer
+        cancelled = isinstance(result, dict) and result.get("cancelled", False)
+        await self._send_tool_output(fc["call_id"], name, fc["arguments"], result, respond=False)
+        return cancelled
+
+    async def _on_speech_started(self, event):
+        logger.debug("Speech started - interrupting any ongoing audio playback")
+        self.turns.finish(interrupted=True)
+        # Barge-in: cancel playback without blocking the event loop
+        await self._barge_in()
+
+    async def _on_speech_stopped(self, event):
+        logger.debug("Speech stopped")
+        self.turns.start()
+
+    # ── Additional Transcription Events ──
+    async def _on_item_created(self, event):
+        item = event.get("item", {})
+        if item.get("type") == "message" and item.get("role") == "assistant":
+            # Log when assistant creates a message
+            content = item.get("content", [])
+            if content and len(content) > 0:
+                if content[0].get("type") == "text":
+                    text_content = content[0].get("text", "")
+                    logger.info(f"🤖 ASSISTANT MESSAGE CREATED: '{text_content}'")
+
+    async def _on_item_truncated(self, event):
+        logger.info(f"Conversation item truncated: {event.get('item_id')} at {event.get('audio_end_ms')} ms")
+
+    async def _barge_in(self):
+        """
+        Interrupt local playback, measure how long it takes to go silent, and
+        truncate the interrupted assistant item to what the user actually heard.
+        """
+        loop = asyncio.get_running_loop()
+        started_at = time.monotonic()
+
+        def on_silenced(silenced_at):
+            try:
+                loop.call_soon_threadsafe(self._record_barge_in, (silenced_at - started_at) * 1000)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        self._stop_fillers()
+        self._fillers_held = self._backend_waiting > 0
+        position = self.audio_handler.interrupt_playback(on_silenced)
+        # Answers to the interrupted turn are stale; background tools keep running
+        cancelled = self.tool_runner.cancel(keep=BACKGROUND_TOOLS)
+        if cancelled:
+            logger.info(f"🧰 Barge-in cancelled {cancelled} in-flight tool call(s)")
+        if position:
+            item_id, content_index, audio_end_ms = position
+            logger.info(f"✂️ Truncating {item_id} at {audio_end_ms} ms of played audio")
+            try:
                 await self.send_event({
-                    "type": "conversation.item.create",
-                    "item": {
-                        "type": "function_call_output",
-                        "call_id": call_id,
-                        "output": json.dumps(result)
-                    }
-                })
-                await self.send_event({"type": "response.create"})
-
-        elif event_type == "input_audio_buffer.speech_started":
-            logger.debug("Speech started - stopping any ongoing audio playback")
-            # Stop any ongoing audio playback when user starts speaking
-            self.audio_handler.stop_streaming_playback()
-
-        elif event_type == "input_audio_buffer.speech_stopped":
-            logger.debug("Speech stopped")
+                    "type": "conversation.item.truncate",
+                    "item_id": item_id,
+                    "content_index": content_index,
+                    "audio_end_ms": audio_end_ms
+                }, hold=False)
+            except websockets.ConnectionClosed:
+                pass  # A resumed session only has the summary, not this item
+
+    def _on_playback(self, event, at):
+        """Audio handler playback callback ("first_sample" or "finished"); may run on the audio thread."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._record_playback, event, at)
+        except RuntimeError:
+            pass  # Event loop already closed
 
-        # ── Additional Transcription Events ──
-        elif event_type == "conversation.item.created":
-            item = event.get("item", {})
-            if item.get("type") == "message" and item.get("role") == "assistant":
-                # Log when assistant creates a message
-                content = item.get("content", [])
-                if content and len(content) > 0:
-                    if content[0].get("type") == "text":
-                        text_content = content[0].get("text", "")
-                        logger.info(f"🤖 ASSISTANT MESSAGE CREATED: '{text_content}'")
+    def _record_playback(self, event, at):
+        if event == "first_sample":
+            self.turns.mark("first_sample_played", at)
+        elif event == "finished":
+            self.turns.mark("playback_finished", at, replace=True)
 
-        elif event_type == "conversation.item.truncated":
-            logger.info(f"Conversation item truncated: {event}")
+    def _record_barge_in(self, latency_ms):
+        self.barge_in_latency.record(latency_ms)
+        logger.info(f"🛑 Barge-in: audio silenced {latency_ms:.1f} ms after speech_started "
+                    f"({self.barge_in_latency.summary()})")
 
     async def send_text(self, text):
         logger.info(f"📤 USER TEXT INPUT: '{text}'")
@@ -222,40 +666,67 @@ class RealtimeClient:
 
     async def send_audio(self):
         """
-        Record and send audio using server-side turn detection
+        Record and send audio using server-side turn detection.
+        Microphone reads happen on the audio handler's capture thread, so this
+        coroutine only awaits frames and never blocks the event loop.
         """
         logger.debug("Starting audio recording for user input")
-        self.audio_handler.start_recording()
-        
+        frames = asyncio.Queue(maxsize=CAPTURE_QUEUE_MAX_FRAMES)
+        self.audio_handler.start_capture(asyncio.get_running_loop(), frames)
+
+        try:
+            await self.stream_audio(frames)
+        finally:
+            # Stop recording even if an exception occurs
+            await asyncio.to_thread(self.audio_handler.stop_capture)
+            logger.debug("Audio recording stopped")
+
+    async def stream_audio(self, frames):
+        """
+        Upload PCM16 frames taken from an asyncio queue until a None sentinel
+        arrives. Used for the local microphone and for gateway callers alike.
+        """
+        self.uplink.reset_stats()
+        if self.vad:
+            self.vad.reset()
+
         try:
             while True:
-                chunk = self.audio_handler.record_chunk()
-                if chunk:
-                    # Encode and send audio chunk
-                    base64_chunk = base64.b64encode(chunk).decode('utf-8')
-                    await self.send_event({
-                        "type": "input_audio_buffer.append",
-                        "audio": base64_chunk
-                    })
-                    await asyncio.sleep(0.01)
-                else:
-                    break
+                chunk = await frames.get()
+                if chunk is None:
+                    break  # Audio source finished
+                for frame in (self.vad.process(chunk) if self.vad else (chunk,)):
+                    await self.uplink.add(frame)
 
         except Exception as e:
-            logger.error(f"Error during audio recording: {e}")
-            self.audio_handler.stop_recording()
-            logger.debug("Audio recording stopped")
-    
+            logger.error(f"Error during audio streaming: {e}")
+
         finally:
-            # Stop recording even if an exception occurs
-            self.audio_handler.stop_recording()
-            logger.debug("Audio recording stopped")
+            await self.uplink.flush()
+            logger.info(f"📤 Uplink stats: {self.uplink.stats()}", extra=LIFECYCLE)
+            if self.vad:
+                logger.info(f"🎙️ Local VAD stats: {self.vad.stats()}", extra=LIFECYCLE)
             if not self.VAD_turn_detection:
                 await self.send_event({"type": "input_audio_buffer.commit"})
                 logger.debug("Audio buffer committed")
 
+    async def _send_audio_append(self, audio):
+        """
+        Encode one batch of PCM audio and append it to the input audio buffer.
+        Audio captured while the socket is down is dropped rather than queued.
+        """
+        try:
+            await self.send_event({
+                "type": "input_audio_buffer.append",
+                "audio": base64.b64encode(audio).decode('utf-8')
+            }, hold=False)
+        except websockets.ConnectionClosed:
+            pass
+
     async def run(self):
         await self.connect()
+        # Open the output device now so the first response pays no device setup cost
+        self.audio_handler.start_output_stream()
         receive_task = asyncio.create_task(self.receive_events())
 
         try:
@@ -276,11 +747,47 @@ class RealtimeClient:
             receive_task.cancel()
             await self.cleanup()
 
+    async def run_scripted(self, settle_s=5.0):
+        """
+        Non-interactive run for headless use: stream the audio source once (e.g.
+        a FileSource), then wait for the replies and any tool calls to finish.
+        """
+        await self.connect()
+        self.audio_handler.start_output_stream()
+        receive_task = asyncio.create_task(self.receive_events())
+        try:
+            await self.send_audio()
+            await asyncio.sleep(settle_s)  # Time for the model to answer the last turn
+            await self.wait_until_idle()
+            logger.info(f"📊 First-sample latency: {self.audio_handler.first_sample_latency.summary()}",
+                        extra=LIFECYCLE)
+        finally:
+            receive_task.cancel()
+            await self.cleanup()
+
+    async def wait_until_idle(self, poll_s=0.1):
+        """Wait until response audio has played out and no tool call is running."""
+        while not self.audio_handler.playback_idle.is_set() or self._tool_tasks:
+            await asyncio.sleep(poll_s)
+
     async def cleanup(self):
+        self._closing = True
+        logger.info(f"📊 Event handling stats: {self.event_stats.summary()}", extra=LIFECYCLE)
+        logger.info(f"🧰 Tool stats: {self.tool_runner.stats()}, backend: {self.backend_queries.stats()}",
+                    extra=LIFECYCLE)
+        self.turns.finish(interrupted=True)
+        logger.info(f"📊 Turn latency: {self.turns.stats.summary()}", extra=LIFECYCLE)
+        self.backend_queries.cancel_all()
+        self._stop_fillers()
+        self.tool_runner.close()
+        for task in list(self._tool_tasks):
+            task.cancel()
         self.audio_handler.stop_streaming_playback()  # Stop any streaming
         self.audio_handler.cleanup()
         if self.ws:
             await self.ws.close()
+        if self.recorder:
+            self.recorder.close()
 
     async def send_immediate_response(self, message: str):
         """Send an immediate text response to the user."""
@@ -295,24 +802,65 @@ class RealtimeClient:
         })  
         await self.send_event({"type": "response.create"})
 
-    async def _execute_backend_tool_async(self, call_id: str, args: dict):
-        """Execute backend tool asynchronously and send result when complete"""
+    def _start_fillers(self):
+        """Start looping filler clips in the caller's language. Returns False when no clips are available."""
+        if not self.fillers:
+            return False
+        if self._filler_task is None or self._filler_task.done():
+            last_user_text = next((text for speaker, text in reversed(self._transcript) if speaker == "User"), "")
+            self._filler_task = asyncio.create_task(self._play_fillers(detect_language(last_user_text)))
+        return True
+
+    def _stop_fillers(self):
+        """Stop queueing filler clips; a clip already playing is left to finish."""
+        if self._filler_task is not None:
+            self._filler_task.cancel()
+            self._filler_task = None
+
+    async def _play_fillers(self, language):
+        while True:
+            clip = self._filler_transcoder.convert(self.fillers.pick(language))
+            # Queued behind whatever is playing, as its own short response
+            self.audio_handler.add_streaming_audio(clip)
+            self.audio_handler.mark_audio_response_complete()
+            await asyncio.sleep(len(clip) / self.audio_handler.bytes_per_ms / 1000 + FILLER_GAP_S)
+
+    def _on_backend_progress(self, stage):
+        """Keep the caller company while the backend works: make sure fillers are playing."""
+        logger.info(f"⏳ Backend progress: {stage}")
+        if self._backend_waiting and not self._fillers_held:
+            self._start_fillers()
+
+    async def _execute_backend_tool_async(self, call_id: str, args: dict, arguments: str = "{}", turn=None,
+                                          timer=None):
+        """
+        Execute backend tool asynchronously and post its result when complete,
+        without asking for a response (see _run_tool_calls()). Identical
+        questions share one backend request and a question from a newer turn
+        cancels older ones (see BackendQueryRegistry). Returns whether it was cancelled.
+        """
+        logger.info(f"🔄 Starting non-blocking backend execution")
+        self._backend_waiting += 1
+        self.turns.tool_started(timer)
         try:
-            logger.info(f"🔄 Starting non-blocking backend execution with args: {args}")
-            result = await TOOLS["query_chatbot_backend"](**args)
-            logger.info(f"✅ Backend tool completed successfully")
-        except Exception as e:
-            result = {"error": str(e)}
-            logger.exception(f"❌ Backend tool failed")
-        
-        # Send the tool result when ready
-        logger.info(f"📤 Sending backend tool result")
-        await self.send_event({
-            "type": "conversation.item.create",
-            "item": {
-                "type": "function_call_output",
-                "call_id": call_id,
-                "output": json.dumps(result)
-            }
-        })
-        await self.send_event({"type": "response.create"})
\ No newline at end of file
+            result = await self.backend_queries.query(
+                args.get("question", ""),
+                turn,
+                lambda: self.tool_runner.run(
+                    "query_chatbot_backend", args, session_id=self.session_id, status_callback=self._on_backend_progress
+                ),
+            )
+        finally:
+            self.turns.tool_finished(timer)
+            self._backend_waiting -= 1
+            if not self._backend_waiting:
+                self._fillers_held = False
+                self._stop_fillers()
+        # The model must still see an output for a cancelled call, but should not answer it
+        cancelled = isinstance(result, dict) and result.get("cancelled", False)
+        if not cancelled and isinstance(result, dict) and "error" in result:
+            logger.error(f"❌ Backend tool failed: {result['error']}")
+        elif not cancelled:
+            logger.info(f"✅ Backend tool completed - sending result")
+        await self._send_tool_output(call_id, "query_chatbot_backend", arguments, result, respond=False)
+        return cancelled
\ No newline at end of file
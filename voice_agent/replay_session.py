@@ -0,0 +1,127 @@
+"""
+Replays a session recorded with SESSION_RECORD_DIR (see session_recorder.py)
+against RealtimeClient's event handlers, tool dispatch and playout buffering,
+without a network or an audio device, for repeatable performance comparisons.
+
+Received events are fed to the client at their recorded times, scaled by
+--speed (1 = real time, 4 = four times faster, 0 = as fast as possible).
+What the client sends goes to a stand-in socket and is counted next to what
+the recorded session sent. Unless --live-tools is given, each tool call
+returns its recorded output after its recorded run time (also scaled).
+
+    python replay_session.py recordings/20250101-120000-local-1a2b3c4d.vrec --speed 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter, deque
+
+from audio_backends import FileSource, NullSink
+from audio_handler import AudioHandler
+from instructions import INSTRUCTIONS
+from logger import logger
+from realtime_client import RealtimeClient
+from session_recorder import SENT, RECEIVED, read_recording
+from tool_runner import ToolRunner
+
+
+class ReplaySocket:
+    """Stands in for the realtime WebSocket and counts the events the client sends, by type."""
+    def __init__(self):
+        self.sent = Counter()
+
+    async def send(self, message):
+        self.sent[json.loads(message)["type"]] += 1
+
+    async def close(self):
+        pass
+
+
+def recorded_tools(records, speed):
+    """
+    Tool functions replaying the recorded calls of each tool in order: every
+    call returns the recorded output after the recorded time from the
+    response.done that asked for it to the output being sent.
+    """
+    requested = {}  # call_id -> (tool name, seconds)
+    runs = {}  # tool name -> deque of (run seconds, output JSON)
+    for direction, seconds, event in records:
+        if direction == RECEIVED and event["type"] == "response.done":
+            for item in event["response"].get("output", []):
+                if item.get("type") == "function_call":
+                    requested[item["call_id"]] = (item["name"], seconds)
+        elif direction == SENT and event["type"] == "conversation.item.create":
+            item = event.get("item", {})
+            if item.get("type") == "function_call_output" and item.get("call_id") in requested:
+                name, requested_at = requested.pop(item["call_id"])
+                runs.setdefault(name, deque()).append((seconds - requested_at, item["output"]))
+
+    def replayed(name):
+        async def tool(**kwargs):
+            if not runs[name]:
+                return {"error": f"No recorded output left for {name}"}
+            run_s, output = runs[name].popleft()
+            if speed > 0:
+                await asyncio.sleep(run_s / speed)
+            return json.loads(output)
+        return tool
+
+    return {name: replayed(name) for name in runs}
+
+
+async def replay(path, speed=1.0, live_tools=False):
+    records = list(read_recording(path))
+    client = RealtimeClient(
+        instructions=INSTRUCTIONS,
+        audio_handler=AudioHandler(source=FileSource(os.devnull), sink=NullSink(speed=speed)),
+    )
+    if not live_tools:
+        client.tool_runner.close()
+        client.tool_runner = ToolRunner(tools=recorded_tools(records, speed))
+    socket = ReplaySocket()
+    client.attach(socket)
+    client.audio_handler.start_output_stream()
+
+    logger.info(f"📼 Replaying {len(records)} events from {path} at {speed:g}x")
+    started_at = time.monotonic()
+    try:
+        for direction, seconds, event in records:
+            if direction != RECEIVED:
+                continue
+            if speed > 0:
+                delay = started_at + seconds / speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await client.handle_event(event)
+        await client.wait_until_idle()
+
+        summary = {
+            "recording": path,
+            "events": len(records),
+            "recorded_s": round(records[-1][1], 2) if records else 0.0,
+            "replayed_s": round(time.monotonic() - started_at, 2),
+            "sent": {
+                "recorded": dict(Counter(event["type"] for direction, _, event in records if direction == SENT)),
+                "replayed": dict(socket.sent),
+            },
+            "event_handling": client.event_stats.summary(),
+            "turns": client.turns.stats.summary(),
+            "tools": client.tool_runner.stats(),
+            "first_sample_latency": client.audio_handler.first_sample_latency.summary(),
+            "playout": client.audio_handler.jitter_buffer.stats(),
+        }
+    finally:
+        await client.cleanup()
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded realtime session against RealtimeClient")
+    parser.add_argument("recording", help="A .vrec file written with SESSION_RECORD_DIR set")
+    parser.add_argument("--speed", type=float, default=1.0, help="Multiple of real time (0 = unpaced)")
+    parser.add_argument("--live-tools", action="store_true", help="Run the real tools instead of recorded outputs")
+    cli_args = parser.parse_args()
+    asyncio.run(replay(cli_args.recording, cli_args.speed, cli_args.live_tools))
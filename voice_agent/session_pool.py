@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import deque
+
+import websockets
+
+from config import (
+    REALTIME_POOL_SIZE,
+    REALTIME_POOL_MAX_AGE_S,
+    REALTIME_POOL_HEALTH_INTERVAL_S,
+    REALTIME_POOL_PRIME_GREETING,
+)
+from logger import logger
+from realtime_client import open_realtime_session
+
+
+class PooledSession:
+    """
+    A realtime WebSocket that is connected and configured but not yet in a call.
+    Messages the server sends while it waits are kept for the client to replay.
+    """
+    def __init__(self, ws, greeting_requested):
+        self.ws = ws
+        self.created_at = time.monotonic()
+        self.greeting_requested = greeting_requested
+        self.early_messages = []
+        self._reader = asyncio.create_task(self._collect())
+
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    def is_open(self):
+        return not self._reader.done()
+
+    async def _collect(self):
+        try:
+            async for message in self.ws:
+                self.early_messages.append(message)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def detach(self):
+        """Stop collecting so the owning client can read the socket itself."""
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+
+    async def is_healthy(self, timeout=5.0):
+        if not self.is_open():
+            return False  # Socket closed while idle
+        try:
+            pong_waiter = await self.ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        await self.detach()
+        await self.ws.close()
+
+
+class RealtimeSessionPool:
+    """
+    Keeps `size` realtime sessions connected with session.update already applied,
+    so a new call skips the TLS handshake, WebSocket upgrade and session setup.
+    Sessions are ping-checked every `health_interval_s` and replaced once older
+    than `max_age_s`, well before the server-side session expiry. With
+    `prime_greeting`, each pooled session also generates the greeting up front
+    and the call replays it immediately.
+    """
+    def __init__(self, session_config, size=REALTIME_POOL_SIZE, max_age_s=REALTIME_POOL_MAX_AGE_S,
+                 health_interval_s=REALTIME_POOL_HEALTH_INTERVAL_S, prime_greeting=REALTIME_POOL_PRIME_GREETING):
+        self.session_config = session_config
+        self.size = size
+        self.max_age_s = max_age_s
+        self.health_interval_s = health_interval_s
+        self.prime_greeting = prime_greeting
+
+        self._ready = deque()
+        self._opening = 0
+        self._refill = asyncio.Event()
+        self._maintainer = None
+
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self):
+        self._maintainer = asyncio.create_task(self._maintain())
+        self._refill.set()
+
+    async def _open_one(self):
+        ws = await open_realtime_session(self.session_config)
+        if self.prime_greeting:
+            await ws.send('{"type": "response.create"}')
+        return PooledSession(ws, greeting_requested=self.prime_greeting)
+
+    async def _fill_slot(self):
+        try:
+            self._ready.append(await self._open_one())
+        except Exception as e:
+            logger.warning(f"🏊 Failed to pre-warm realtime session: {e}")
+        finally:
+            self._opening -= 1
+
+    async def _is_stale(self, session):
+        return session.age() > self.max_age_s or not await session.is_healthy()
+
+    async def _recycle(self):
+        # Ping concurrently: one unresponsive session must not hold up the checks of the others
+        sessions = list(self._ready)
+        stale = await asyncio.gather(*(self._is_stale(session) for session in sessions))
+        for session, is_stale in zip(sessions, stale):
+            if is_stale and session in self._ready:
+                self._ready.remove(session)
+                asyncio.create_task(session.close())
+
+    async def _maintain(self):
+        while True:
+            await self._recycle()
+            missing = self.size - len(self._ready) - self._opening
+            for _ in range(max(missing, 0)):
+                self._opening += 1
+                asyncio.create_task(self._fill_slot())
+            self._refill.clear()
+            try:
+                await asyncio.wait_for(self._refill.wait(), self.health_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def acquire(self):
+        """
+        Return a ready PooledSession, or None when the pool is empty (the caller
+        then connects directly). A replacement session starts warming at once.
+        """
+        session = None
+        while self._ready:
+            candidate = self._ready.popleft()
+            if candidate.age() <= self.max_age_s and candidate.is_open():
+                session = candidate
+                break
+            asyncio.create_task(candidate.close())
+        self._refill.set()
+
+        if session is None:
+            self.misses += 1
+            logger.info("🏊 Realtime session pool empty - connecting directly")
+            return None
+        self.hits += 1
+        await session.detach()
+        return session
+
+    def stats(self):
+        return {"ready": len(self._ready), "opening": self._opening, "hits": self.hits, "misses": self.misses}
+
+    async def close(self):
+        if self._maintainer:
+            self._maintainer.cancel()
+        while self._ready:
+            await self._ready.popleft().close()
@@ -0,0 +1,92 @@
+"""
+Compact append-only recordings of realtime sessions.
+
+A recording is a 5-byte header (b"VREC" and a version byte) followed by one
+record per event sent or received:
+
+    struct "<BdII": direction (0 = sent, 1 = received),
+                    seconds since the recording started,
+                    length of the event JSON, length of the audio payload
+    event JSON (UTF-8), without its audio field
+    audio payload (raw bytes, not base64)
+
+Audio travels as base64 in input_audio_buffer.append ("audio") and
+response.audio.delta ("delta"); it is stored decoded, a quarter smaller,
+and restored as base64 on reading. replay_session.py re-runs a recording
+against RealtimeClient.
+"""
+import base64
+import json
+import os
+import struct
+import time
+import uuid
+
+from logger import LIFECYCLE, logger
+
+MAGIC = b"VREC\x01"
+SENT = 0
+RECEIVED = 1
+
+_RECORD = struct.Struct("<BdII")
+
+# Event type -> field holding base64 audio
+AUDIO_FIELDS = {
+    "input_audio_buffer.append": "audio",
+    "response.audio.delta": "delta",
+}
+
+
+class SessionRecorder:
+    """Appends the events of one session to `path` as they are sent and received."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._started_at = time.monotonic()
+        self.events = 0
+
+    @classmethod
+    def for_call(cls, directory, session_id=None):
+        """A recorder writing a new, uniquely named file in `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{session_id or 'local'}-{uuid.uuid4().hex[:8]}.vrec"
+        return cls(os.path.join(directory, name))
+
+    def record(self, direction, event):
+        audio = b""
+        field = AUDIO_FIELDS.get(event.get("type"))
+        if field and field in event:
+            audio = base64.b64decode(event[field])
+            event = {key: value for key, value in event.items() if key != field}
+        body = json.dumps(event, separators=(",", ":")).encode("utf-8")
+        self._file.write(_RECORD.pack(direction, time.monotonic() - self._started_at, len(body), len(audio)))
+        self._file.write(body)
+        self._file.write(audio)
+        self.events += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"📼 Recorded {self.events} events to {self.path}", extra=LIFECYCLE)
+
+
+def read_recording(path):
+    """Yield (direction, seconds, event) for every record in the recording at `path`."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return  # End of file, or a record cut short by a crash
+            direction, seconds, body_length, audio_length = _RECORD.unpack(header)
+            body = f.read(body_length)
+            audio = f.read(audio_length)
+            if len(body) < body_length or len(audio) < audio_length:
+                return
+            event = json.loads(body)
+            if audio_length:
+                event[AUDIO_FIELDS[event["type"]]] = base64.b64encode(audio).decode("ascii")
+            yield direction, seconds, event
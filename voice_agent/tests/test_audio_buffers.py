@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from audio_buffers import JitterBuffer, RingBuffer, offer_latest
+
+
+def test_ring_buffer_keeps_writes_in_order():
+    ring = RingBuffer(8)
+    ring.write(b"abc")
+    ring.write(b"de")
+    assert len(ring) == 5
+    assert ring.read_all() == b"abcde"
+
+
+def test_ring_buffer_overwrites_oldest_when_wrapping():
+    ring = RingBuffer(8)
+    ring.write(b"abcdef")
+    ring.write(b"ghij")
+    assert len(ring) == 8
+    assert ring.read_all() == b"cdefghij"
+
+
+def test_ring_buffer_write_larger_than_capacity():
+    ring = RingBuffer(4)
+    ring.write(b"ab")
+    ring.write(b"0123456789")
+    assert ring.read_all() == b"6789"
+    ring.write(b"x")
+    assert ring.read_all() == b"789x"
+
+
+def test_ring_buffer_clear_and_empty_write():
+    ring = RingBuffer(4)
+    ring.write(b"abcd")
+    ring.clear()
+    ring.write(b"")
+    assert len(ring) == 0
+    assert ring.read_all() == b""
+
+
+def test_ring_buffer_rejects_non_positive_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_offer_latest_drops_oldest():
+    queue = asyncio.Queue(maxsize=2)
+    for item in (1, 2, 3):
+        offer_latest(queue, item)
+    assert [queue.get_nowait(), queue.get_nowait()] == [2, 3]
+
+
+# 1 byte per ms keeps the arithmetic readable
+def make_jitter_buffer(**kwargs):
+    return JitterBuffer(bytes_per_ms=1, min_target_ms=40, **kwargs)
+
+
+def test_jitter_buffer_prebuffers_until_target():
+    buffer = make_jitter_buffer()
+    buffer.put(b"\x01" * 20)
+    assert buffer.read(10, timeout=0) == (b"", 0, False)
+    buffer.put(b"\x02" * 20)
+    audio, end_offset, reached_end = buffer.read(30, timeout=0)
+    assert audio == b"\x01" * 20 + b"\x02" * 10
+    assert end_offset == 30
+    assert not reached_end
+
+
+def test_jitter_buffer_end_marker_drains_below_target():
+    buffer = make_jitter_buffer()
+    buffer.put(b"\x01" * 10)
+    buffer.mark_end()
+    audio, end_offset, reached_end = buffer.read(100, timeout=0)
+    assert audio == b"\x01" * 10
+    assert end_offset == 10
+    assert reached_end
+    assert len(buffer) == 0
+
+
+def test_jitter_buffer_end_marker_reported_with_last_audio_only():
+    buffer = make_jitter_buffer()
+    buffer.put(b"\x01" * 10)
+    buffer.mark_end()
+    assert buffer.read(4, timeout=0) == (b"\x01" * 4, 4, False)
+    assert buffer.read(100, timeout=0) == (b"\x01" * 6, 10, True)
+
+
+def test_jitter_buffer_stops_at_marker_between_streams():
+    buffer = make_jitter_buffer()
+    buffer.put(b"\x01" * 10)
+    buffer.mark_end()
+    buffer.put(b"\x02" * 10)
+    assert buffer.read(100, timeout=0) == (b"\x01" * 10, 10, True)
+    # The next stream pre-buffers again
+    assert buffer.read(100, timeout=0) == (b"", 10, False)
+    buffer.mark_end()
+    assert buffer.read(100, timeout=0) == (b"\x02" * 10, 20, True)
+
+
+def test_jitter_buffer_overflow_keeps_end_of_dropped_stream():
+    buffer = make_jitter_buffer(max_buffer_ms=30)
+    buffer.put(b"\x01" * 20)
+    buffer.mark_end()
+    buffer.put(b"\x02" * 20)
+    assert buffer.overruns == 1
+    assert buffer.dropped_bytes == 20
+    # The dropped stream still ends, with no audio left to play
+    assert buffer.read(100, timeout=0) == (b"", 20, True)
+    assert buffer.read(100, timeout=0) == (b"", 20, False)
+    buffer.mark_end()
+    assert buffer.read(100, timeout=0) == (b"\x02" * 20, 40, True)
+
+
+def test_jitter_buffer_overflow_drops_marker_of_dropped_stream():
+    buffer = make_jitter_buffer(max_buffer_ms=30)
+    buffer.put(b"\x01" * 20)
+    buffer.mark_end()
+    buffer.put(b"\x02" * 20)
+    buffer.put(b"\x03" * 20)
+    assert buffer.dropped_bytes == 40
+    # The first stream and its marker are both gone: nothing ends, and the rest waits for the target
+    assert buffer.read(100, timeout=0) == (b"", 40, False)
+
+
+def test_jitter_buffer_clear_drops_audio_and_markers():
+    buffer = make_jitter_buffer()
+    buffer.put(b"\x01" * 50)
+    buffer.mark_end()
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.read(10, timeout=0) == (b"", 50, False)
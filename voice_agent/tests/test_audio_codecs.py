@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from audio_codecs import AUDIO_FORMATS, Resampler, Transcoder, decode_to_pcm16, encode_pcm16, negotiate_format
+
+ALL_PCM16 = np.arange(-32768, 32768).astype(np.int16)
+ALL_CODES = bytes(range(256))
+
+
+# Reference values from the ITU-T G.711 tables (as produced by audioop)
+@pytest.mark.parametrize("encoding, code, value", [
+    ("g711_ulaw", 0x00, -32124),
+    ("g711_ulaw", 0x7F, 0),
+    ("g711_ulaw", 0x80, 32124),
+    ("g711_ulaw", 0xFF, 0),
+    ("g711_ulaw", 0x2A, -5372),
+    ("g711_alaw", 0xD5, 8),
+    ("g711_alaw", 0x55, -8),
+    ("g711_alaw", 0xAA, 32256),
+    ("g711_alaw", 0x2A, -32256),
+    ("g711_alaw", 0x80, 5504),
+])
+def test_g711_decode_table(encoding, code, value):
+    assert decode_to_pcm16(bytes([code]), encoding)[0] == value
+
+
+@pytest.mark.parametrize("encoding, value, code", [
+    ("g711_ulaw", 0, 0xFF),
+    ("g711_ulaw", -1, 0x7E),
+    ("g711_ulaw", 32767, 0x80),
+    ("g711_ulaw", -32768, 0x00),
+    ("g711_alaw", 0, 0xD5),
+    ("g711_alaw", -1, 0x55),
+    ("g711_alaw", 32767, 0xAA),
+    ("g711_alaw", -32768, 0x2A),
+])
+def test_g711_encode_table(encoding, value, code):
+    assert encode_pcm16(np.array([value], dtype=np.int16), encoding) == bytes([code])
+
+
+@pytest.mark.parametrize("encoding", ["g711_ulaw", "g711_alaw"])
+def test_g711_code_words_round_trip(encoding):
+    decoded = decode_to_pcm16(ALL_CODES, encoding)
+    assert np.array_equal(decode_to_pcm16(encode_pcm16(decoded, encoding), encoding), decoded)
+
+
+@pytest.mark.parametrize("encoding", ["g711_ulaw", "g711_alaw"])
+def test_g711_encoding_is_monotonic(encoding):
+    decoded = decode_to_pcm16(encode_pcm16(ALL_PCM16, encoding), encoding)
+    assert np.all(np.diff(decoded.astype(np.int32)) >= 0)
+
+
+@pytest.mark.parametrize("encoding, max_error", [("g711_ulaw", 1024), ("g711_alaw", 1024)])
+def test_g711_quantization_error_is_bounded(encoding, max_error):
+    decoded = decode_to_pcm16(encode_pcm16(ALL_PCM16, encoding), encoding)
+    assert np.abs(decoded.astype(np.int32) - ALL_PCM16).max() <= max_error
+
+
+def test_pcm16_passes_through():
+    samples = np.array([-32768, -1, 0, 1, 32767], dtype=np.int16)
+    assert np.array_equal(decode_to_pcm16(encode_pcm16(samples, "pcm16"), "pcm16"), samples)
+
+
+def test_negotiate_format():
+    assert negotiate_format("g711_ulaw") == (AUDIO_FORMATS["g711_ulaw"], AUDIO_FORMATS["g711_ulaw"])
+    assert negotiate_format("pcm16_8k") == (AUDIO_FORMATS["pcm16_8k"], AUDIO_FORMATS["pcm16"])
+    with pytest.raises(ValueError):
+        negotiate_format("opus")
+
+
+@pytest.mark.parametrize("src_rate, dst_rate", [(8000, 24000), (16000, 24000), (24000, 8000), (24000, 16000)])
+def test_resampler_output_length(src_rate, dst_rate):
+    resampler = Resampler(src_rate, dst_rate)
+    assert len(resampler.process(np.zeros(src_rate, dtype=np.int16))) == dst_rate
+
+
+@pytest.mark.parametrize("src_rate, dst_rate", [(8000, 24000), (24000, 8000), (16000, 24000)])
+def test_resampler_length_is_exact_across_uneven_chunks(src_rate, dst_rate):
+    resampler = Resampler(src_rate, dst_rate)
+    sizes = [1, 7, 160, 333, 1000, 2499]
+    total = sum(len(resampler.process(np.zeros(size, dtype=np.int16))) for size in sizes)
+    assert total == sum(sizes) * dst_rate // src_rate
+
+
+def test_resampler_chunking_is_seamless():
+    t = np.arange(8000) / 8000
+    tone = (10000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    whole = Resampler(8000, 24000).process(tone)
+    chunked = Resampler(8000, 24000)
+    pieces = np.concatenate([chunked.process(chunk) for chunk in np.array_split(tone, 37)])
+    assert np.array_equal(pieces, whole)
+    # Upsampling by 3 keeps every input sample at every third output sample
+    assert np.array_equal(whole[2::3], tone)
+
+
+def test_resampler_empty_chunk():
+    assert len(Resampler(8000, 24000).process(np.zeros(0, dtype=np.int16))) == 0
+
+
+def test_transcoder_ulaw_to_pcm16():
+    transcoder = Transcoder(AUDIO_FORMATS["g711_ulaw"], AUDIO_FORMATS["pcm16"])
+    out = transcoder.convert(bytes([0xFF]) * 160)  # 20 ms of silence
+    assert len(out) == 480 * 2
+    assert not np.frombuffer(out, dtype=np.int16).any()
+
+
+def test_transcoder_passthrough():
+    transcoder = Transcoder(AUDIO_FORMATS["pcm16"], AUDIO_FORMATS["pcm16"])
+    assert transcoder.passthrough
+    assert transcoder.convert(b"\x01\x02") == b"\x01\x02"
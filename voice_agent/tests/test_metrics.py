@@ -0,0 +1,111 @@
+from metrics import Histogram, LatencyStats, TurnTracker
+
+
+def test_histogram_percentile_is_bucket_upper_bound():
+    histogram = Histogram(bounds=(1, 10, 100))
+    for ms in (0.5, 0.7, 5, 50, 50, 50, 50, 50, 50, 80):
+        histogram.record(ms)
+    assert histogram.counts == [2, 1, 7, 0]
+    assert histogram.percentile(10) == 1
+    assert histogram.percentile(20) == 1
+    assert histogram.percentile(30) == 10
+    assert histogram.percentile(50) == 100
+    assert histogram.percentile(100) == 100
+
+
+def test_histogram_value_on_bound_falls_in_that_bucket():
+    histogram = Histogram(bounds=(1, 10))
+    histogram.record(10)
+    assert histogram.counts == [0, 1, 0]
+    assert histogram.percentile(50) == 10
+
+
+def test_histogram_overflow_bucket_reports_max():
+    histogram = Histogram(bounds=(1, 10))
+    for ms in (0.5, 2, 250, 40):
+        histogram.record(ms)
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(99) == 250
+    assert histogram.summary() == {"count": 4, "mean_ms": 73.125, "p50_ms": 10, "p99_ms": 250, "max_ms": 250}
+
+
+def test_histogram_empty():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+    assert histogram.summary() == {"count": 0}
+
+
+def test_latency_stats_nearest_rank():
+    stats = LatencyStats()
+    for ms in range(1, 101):
+        stats.record(ms)
+    assert stats.percentile(50) == 50
+    assert stats.percentile(95) == 95
+    assert stats.percentile(0) == 1
+    assert stats.percentile(100) == 100
+
+
+def test_latency_stats_keeps_recent_samples_but_counts_all():
+    stats = LatencyStats(max_samples=2)
+    for ms in (100, 1, 2):
+        stats.record(ms)
+    assert stats.count == 3
+    assert stats.summary()["max_ms"] == 2
+
+
+def test_turn_finishes_once_response_done_and_played():
+    finished = []
+    tracker = TurnTracker(sinks=[finished.append])
+    tracker.start(at=0)
+    tracker.audio_received()
+    tracker.response_done()
+    assert not finished
+    tracker.mark("first_sample_played")
+    tracker.mark("playback_finished")
+    assert [turn.number for turn in finished] == [1]
+    assert not finished[0].interrupted
+    assert tracker.stats.turns == 1
+
+
+def test_turn_stays_open_for_tools_after_preamble():
+    finished = []
+    tracker = TurnTracker(sinks=[finished.append])
+    tracker.start()
+    # A spoken preamble that also requests a tool call
+    tracker.audio_received()
+    tracker.mark("first_sample_played")
+    turn = tracker.response_done(calls=1)
+    tracker.mark("playback_finished")
+    tracker.tool_started(turn)
+    tracker.tool_finished(turn)
+    assert not finished
+
+    # The answer to the tool output
+    tracker.audio_received()
+    tracker.response_done()
+    assert not finished  # Its audio has not played yet
+    tracker.mark("playback_finished", replace=True)
+    assert finished == [turn]
+    assert set(turn.offsets_ms()) >= {"first_audio_delta", "response_done", "tool_started", "tool_finished",
+                                      "first_sample_played", "playback_finished"}
+
+
+def test_playback_marks_need_model_audio_first():
+    tracker = TurnTracker()
+    turn = tracker.start()
+    # Filler audio plays before any model audio arrives
+    tracker.mark("first_sample_played")
+    tracker.mark("playback_finished")
+    assert "first_sample_played" not in turn.marks
+    assert "playback_finished" not in turn.marks
+
+
+def test_new_turn_interrupts_unplayed_turn():
+    finished = []
+    tracker = TurnTracker(sinks=[finished.append])
+    first = tracker.start()
+    tracker.audio_received()
+    tracker.start()
+    assert finished == [first]
+    assert first.interrupted
+    assert tracker.stats.interrupted == 1
@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import inspect
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import TOOL_WORKERS, TOOL_TIMEOUT_S, TOOL_TIMEOUTS_S, BACKEND_MAX_CONCURRENT_PER_CALL
+from logger import logger
+from metrics import LatencyStats
+from tools import TOOLS
+
+
+class ToolRunner:
+    """
+    Runs voice tools for one call without blocking the event loop.
+
+    Synchronous tools go to a bounded thread pool (shared when `executor` is
+    given, otherwise a private pool of TOOL_WORKERS threads); coroutine tools
+    run as tasks. Every run is tracked so cancel() can abandon it on barge-in
+    or hang-up, and is bounded by a per-tool timeout. A thread that is already
+    running cannot be interrupted; its result is simply discarded. `tools`
+    maps tool names to functions (tools.TOOLS by default).
+    """
+    def __init__(self, executor=None, timeouts=None, default_timeout_s=TOOL_TIMEOUT_S, tools=None):
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="voice-tool")
+        self.timeouts = {**TOOL_TIMEOUTS_S, **(timeouts or {})}
+        self.default_timeout_s = default_timeout_s
+        self.tools = TOOLS if tools is None else tools
+
+        self._running = {}  # asyncio.Task -> tool name
+        self.latency = {}  # tool name -> LatencyStats
+        self.timed_out = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def timeout_for(self, name):
+        return self.timeouts.get(name, self.default_timeout_s)
+
+    @property
+    def in_flight(self):
+        return len(self._running)
+
+    async def run(self, name, args, **extra):
+        """
+        Run tool `name` with `args` (plus any `extra` keyword arguments) and
+        return its result. Failures and timeouts come back as {"error": ...};
+        a run abandoned through cancel() comes back with "cancelled": True.
+        """
+        tool = self.tools.get(name)
+        if tool is None:
+            return {"error": f"Unknown tool: {name}"}
+
+        task = asyncio.create_task(self._invoke(name, tool, {**args, **extra}))
+        self._running[task] = name
+        try:
+            # wait() rather than awaiting the task, so cancel() is reported as a result
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            self._running.pop(task, None)
+
+        if task.cancelled():
+            self.cancelled += 1
+            logger.info(f"🧰 Tool {name} cancelled")
+            return {"error": f"{name} was cancelled", "cancelled": True}
+        return task.result()
+
+    async def _invoke(self, name, tool, kwargs):
+        timeout = self.timeout_for(name)
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(tool):
+                call = tool(**kwargs)
+            else:
+                call = asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(tool, **kwargs))
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(f"🧰 Tool {name} timed out after {timeout:g} s")
+            return {"error": f"{name} timed out after {timeout:g} seconds"}
+        except Exception as e:
+            self.failed += 1
+            logger.exception(f"Tool {name} failed")
+            return {"error": str(e)}
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.latency.setdefault(name, LatencyStats()).record(elapsed_ms)
+
+    def cancel(self, keep=()):
+        """Cancel in-flight tool runs, except tools named in `keep`. Returns how many were cancelled."""
+        victims = [task for task, name in self._running.items() if name not in keep and not task.done()]
+        for task in victims:
+            task.cancel()
+        return len(victims)
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "latency": {name: stats.summary() for name, stats in self.latency.items()},
+        }
+
+    def close(self):
+        self.cancel()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace, so rephrasings of the same words match."""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+class BackendQueryRegistry:
+    """
+    Tracks one call's in-flight backend queries.
+
+    Questions that normalize to the same text share one backend request. A
+    question asked in a newer turn supersedes, and cancels, the queries still
+    running for older turns, so a rephrased question does not leave the first
+    attempt consuming backend capacity and injecting a stale answer. At most
+    `max_concurrent` requests run at once; the rest wait for a slot.
+    """
+    def __init__(self, max_concurrent=BACKEND_MAX_CONCURRENT_PER_CALL):
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._queries = {}  # normalized question -> [turn, asyncio.Task]
+        self.started = 0
+        self.deduplicated = 0
+        self.superseded = 0
+
+    async def query(self, question, turn, run):
+        """
+        Return the result of the coroutine function `run` for `question`,
+        joining an identical in-flight query when there is one. `turn`
+        identifies the response that asked. A query cancelled because a newer
+        turn superseded it comes back as {"error": ..., "cancelled": True}.
+        """
+        key = normalize_question(question)
+        for other_key, (other_turn, task) in list(self._queries.items()):
+            if other_key != key and other_turn != turn and not task.done():
+                task.cancel()
+                self.superseded += 1
+                logger.info(f"🧰 Backend query superseded: '{other_key}'")
+
+        entry = self._queries.get(key)
+        if entry is not None and not entry[1].done():
+            entry[0] = turn  # Asked again, so it belongs to the newest turn
+            task = entry[1]
+            self.deduplicated += 1
+            logger.info(f"🧰 Joining in-flight backend query: '{key}'")
+        else:
+            task = asyncio.create_task(self._run_limited(run))
+            self._queries[key] = [turn, task]
+            task.add_done_callback(functools.partial(self._forget, key))
+            self.started += 1
+
+        # wait() rather than awaiting the task: it is shared, and one waiter
+        # being cancelled must not cancel it for the others
+        await asyncio.wait({task})
+        if task.cancelled():
+            return {"error": "This question was superseded by a newer one", "cancelled": True}
+        return task.result()
+
+    async def _run_limited(self, run):
+        async with self._slots:
+            return await run()
+
+    def _forget(self, key, task):
+        entry = self._queries.get(key)
+        if entry is not None and entry[1] is task:
+            del self._queries[key]
+
+    @property
+    def in_flight(self):
+        return len(self._queries)
+
+    def cancel_all(self):
+        for _, task in self._queries.values():
+            task.cancel()
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "started": self.started,
+            "deduplicated": self.deduplicated,
+            "superseded": self.superseded,
+        }
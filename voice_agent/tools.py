@@ -1,54 +1,38 @@
 import os
-import logging
 import asyncio, base64, datetime, textwrap, bs4, requests
 from zoneinfo import ZoneInfo
 from faq_agent.information_center_agent import faq_knowledge_base
 
 from logger import logger
 
-# Optional: Only if not configured globally elsewhere
-if not logger.handlers:
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-
 # ── Tool: Get Time ────────────────────────────
 def get_time(city: str, status_callback=None, **kwargs) -> dict:
     """Return IST time, regardless of requested city (demo)."""
-    logger.info(f"[get_time] Arguments received - city: '{city}', kwargs: {kwargs}")
-    
     now_ist = datetime.datetime.now(ZoneInfo("Asia/Kolkata"))
     result = {"time": f"It is {now_ist:%H:%M} IST in {city}."}
-    
-    logger.info(f"[get_time] Generated time result: {result}")
+    logger.info(f"[get_time] city: '{city}' -> {result['time']}")
     return result
 
 # ── Tool: Chatbot Backend Integration ─────────────────
-async def query_chatbot_backend(question: str, status_callback=None, **kwargs) -> dict:
+async def query_chatbot_backend(question: str, status_callback=None, session_id=None, **kwargs) -> dict:
     """
     Query the LangGraph chatbot backend for complex financial questions,
     account details, reports, and other advanced queries that require
-    the full agentic workflow.
+    the full agentic workflow. `session_id` selects the backend conversation
+    (the voice agent's process-wide session when None). `status_callback`
+    receives the backend's progress stages while the answer streams in.
     """
-    logger.info(f"[query_chatbot_backend] Arguments received - question: '{question}', kwargs: {kwargs}")
-    
+    logger.info(f"[query_chatbot_backend] Calling backend with question: '{question}'")
+
     try:
-        from chat_wrapper import run_chat
-        logger.info(f"[query_chatbot_backend] Calling backend with question: '{question}'")
-        response = await run_chat(question)
-        
-        # Log full response details
+        from chat_wrapper import run_chat_stream
+        response = await run_chat_stream(question, session_id=session_id, on_progress=status_callback)
         logger.info(f"[query_chatbot_backend] Backend returned {len(response)} characters")
-        logger.info(f"[query_chatbot_backend] Full backend response: {response}")
-        
-        result = {"response": response}
-        logger.info(f"[query_chatbot_backend] Returning result: {result}")
-        return result
+        logger.debug("[query_chatbot_backend] Full backend response: %s", response)
+        return {"response": response}
     except Exception as e:
         error_msg = f"Backend query failed: {e}"
-        logger.error(f"[query_chatbot_backend] Error occurred: {error_msg}")
-        logger.error(f"[query_chatbot_backend] Exception details: {type(e).__name__}: {str(e)}")
+        logger.error(f"[query_chatbot_backend] {type(e).__name__}: {error_msg}")
         return {"error": error_msg}
 
 # ── Tool Schemas ─────────────────────────────
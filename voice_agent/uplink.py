@@ -0,0 +1,60 @@
+import asyncio
+from metrics import RateCounter
+
+
+class UplinkBatcher:
+    """
+    Coalesces captured PCM frames into larger input_audio_buffer.append
+    payloads. A batch is sent once it holds `batch_ms` of audio, or when
+    `max_latency_ms` has passed since its first frame, whichever comes first.
+    A `batch_ms` of 0 sends every frame as it arrives.
+    """
+    def __init__(self, send, bytes_per_ms, batch_ms=100, max_latency_ms=100):
+        self._send = send  # async callable taking the raw PCM bytes of one batch
+        self.batch_bytes = int(batch_ms * bytes_per_ms)
+        self.max_latency = max_latency_ms / 1000
+        self._pending = bytearray()
+        self._flush_timer = None
+        self._lock = asyncio.Lock()
+
+        self.events = RateCounter()
+        self.bytes = RateCounter()
+
+    def reset_stats(self):
+        self.events.reset()
+        self.bytes.reset()
+
+    async def add(self, frame):
+        self._pending += frame
+        if len(self._pending) >= self.batch_bytes:
+            await self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_after_timeout())
+
+    async def _flush_after_timeout(self):
+        await asyncio.sleep(self.max_latency)
+        self._flush_timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Send whatever is pending immediately."""
+        if self._flush_timer is not None and self._flush_timer is not asyncio.current_task():
+            self._flush_timer.cancel()
+        self._flush_timer = None
+        if not self._pending:
+            return
+
+        data = bytes(self._pending)
+        self._pending.clear()
+        async with self._lock:  # Keep batches ordered on the socket
+            await self._send(data)
+        self.events.add()
+        self.bytes.add(len(data))
+
+    def stats(self):
+        return {
+            "events": self.events.total,
+            "events_per_sec": round(self.events.rate(), 1),
+            "bytes": self.bytes.total,
+            "bytes_per_sec": round(self.bytes.rate()),
+        }
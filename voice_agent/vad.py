@@ -0,0 +1,101 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """
+    Client-side voice activity gate for PCM16 mono audio.
+
+    Each captured chunk is classified as speech or silence from its RMS
+    energy (dBFS, relative to an adaptive noise floor) and its zero-crossing
+    rate, computed on a numpy view of the raw buffer. Silent chunks are held
+    back, except for:
+    - pre-roll: the last `preroll_ms` of silence is released when speech
+      starts, so the server's `prefix_padding_ms` still has audio to keep;
+    - hangover: silence keeps flowing for `hangover_ms` after speech, so
+      `server_vad` sees enough trailing silence to end the turn.
+    """
+    def __init__(self, sample_rate, energy_threshold_db=-45.0, noise_margin_db=10.0,
+                 max_zcr=0.4, preroll_ms=300, hangover_ms=1200):
+        self.sample_rate = sample_rate
+        self.energy_threshold_db = energy_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.max_zcr = max_zcr
+        self.preroll_ms = preroll_ms
+        self.hangover_ms = hangover_ms
+
+        self.noise_floor_db = energy_threshold_db - noise_margin_db
+        self._preroll = deque()
+        self._preroll_ms = 0.0
+        self._hangover_left_ms = 0.0
+        self.in_speech = False
+
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def _chunk_ms(self, chunk):
+        return len(chunk) / 2 / self.sample_rate * 1000
+
+    def classify(self, chunk):
+        """Return (is_speech, energy_db, zcr) for one PCM16 chunk."""
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        if samples.size == 0:
+            return False, -math.inf, 0.0
+
+        x = samples.astype(np.float32)
+        rms = math.sqrt(float(np.dot(x, x)) / samples.size)
+        energy_db = 20 * math.log10(rms / 32768.0) if rms > 0 else -math.inf
+        zcr = np.count_nonzero(np.diff(np.signbit(samples))) / samples.size
+
+        threshold = max(self.energy_threshold_db, self.noise_floor_db + self.noise_margin_db)
+        is_speech = energy_db >= threshold and zcr <= self.max_zcr
+        if -math.inf < energy_db < threshold:
+            # Track background level slowly while nobody is talking (loud hiss rejected
+            # only for its zero-crossing rate must not raise the floor)
+            self.noise_floor_db += 0.05 * (energy_db - self.noise_floor_db)
+        return is_speech, energy_db, zcr
+
+    def process(self, chunk):
+        """Return the list of chunks that should be uploaded for this input chunk."""
+        self.frames_in += 1
+        chunk_ms = self._chunk_ms(chunk)
+        is_speech, _, _ = self.classify(chunk)
+
+        if is_speech:
+            out = list(self._preroll)
+            out.append(chunk)
+            self._preroll.clear()
+            self._preroll_ms = 0.0
+            self._hangover_left_ms = self.hangover_ms
+            self.in_speech = True
+        elif self._hangover_left_ms > 0:
+            self._hangover_left_ms -= chunk_ms
+            out = [chunk]
+        else:
+            self.in_speech = False
+            self._preroll.append(chunk)
+            self._preroll_ms += chunk_ms
+            while self._preroll and self._preroll_ms - self._chunk_ms(self._preroll[0]) >= self.preroll_ms:
+                self._preroll_ms -= self._chunk_ms(self._preroll.popleft())
+            out = []
+
+        self.frames_out += len(out)
+        return out
+
+    def reset(self):
+        self._preroll.clear()
+        self._preroll_ms = 0.0
+        self._hangover_left_ms = 0.0
+        self.in_speech = False
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def stats(self):
+        suppressed = max(self.frames_in - self.frames_out, 0)
+        return {
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "suppressed_pct": round(100 * suppressed / self.frames_in, 1) if self.frames_in else 0.0,
+        }